@@ -0,0 +1,70 @@
+import numpy as np
+
+# Outcomes kept per word: one bit each, newest in the lowest bit
+HISTORY_BITS = 64
+RECENT_ANSWERS = 20
+
+ALL_BITS = np.uint64(0xFFFFFFFFFFFFFFFF)
+
+
+def low_bits(n):
+    """Mask of the lowest `n` bits (n up to 64), elementwise for arrays."""
+    n = np.minimum(np.asarray(n, dtype=np.uint64), np.uint64(HISTORY_BITS))
+    # Shifting a 64-bit value by 64 is undefined, so build the mask from the top instead
+    return np.where(n == 0, np.uint64(0), ALL_BITS >> (np.uint64(HISTORY_BITS) - np.maximum(n, np.uint64(1))))
+
+
+def popcount(bits):
+    if hasattr(np, 'bitwise_count'):
+        return np.bitwise_count(bits).astype(np.int64)
+    # Parallel bit count for NumPy versions before 2.0
+    bits = bits - ((bits >> np.uint64(1)) & np.uint64(0x5555555555555555))
+    bits = (bits & np.uint64(0x3333333333333333)) + ((bits >> np.uint64(2)) & np.uint64(0x3333333333333333))
+    bits = (bits + (bits >> np.uint64(4))) & np.uint64(0x0F0F0F0F0F0F0F0F)
+    return ((bits * np.uint64(0x0101010101010101)) >> np.uint64(56)).astype(np.int64)
+
+
+def streaks(bits, counts):
+    """Current run of correct answers of every word."""
+    # The run ends at the lowest 0 bit: isolate it in ~bits and count the 1s below it
+    wrong = ~bits
+    lowest_wrong = wrong & (~wrong + np.uint64(1))
+    run = np.where(wrong == 0, HISTORY_BITS, popcount(lowest_wrong - np.uint64(1)))
+    return np.minimum(run, counts)
+
+
+def recent_accuracy(bits, counts, window=RECENT_ANSWERS):
+    """Share of the last `window` answers that were correct (NaN for words never answered)."""
+    answered = np.minimum(counts, window)
+    with np.errstate(invalid='ignore', divide='ignore'):
+        return popcount(bits & low_bits(answered)) / answered
+
+
+class AnswerHistory:
+    """
+    The last HISTORY_BITS outcomes of every word of a deck, as NumPy arrays.
+
+    Mirrors the words.answer_bits / answer_count columns, so questions about
+    every word's recent answers are a few bit operations over the arrays.
+    """
+
+    def __init__(self, rows):
+        # rows: (word_id, answer_bits, answer_count); answer_bits is signed in SQLite
+        rows = np.array(rows, dtype=np.int64).reshape(-1, 3)
+        self.word_ids = rows[:, 0]
+        self.bits = rows[:, 1].view(np.uint64)
+        self.counts = rows[:, 2]
+        self.index = {word_id: i for i, word_id in enumerate(self.word_ids.tolist())}
+
+    def record(self, word_id, correct):
+        i = self.index.get(word_id)
+        if i is None:
+            return
+        self.bits[i] = (self.bits[i] << np.uint64(1)) | np.uint64(bool(correct))
+        self.counts[i] = min(self.counts[i] + 1, HISTORY_BITS)
+
+    def streaks(self):
+        return streaks(self.bits, self.counts)
+
+    def recent_accuracy(self, window=RECENT_ANSWERS):
+        return recent_accuracy(self.bits, self.counts, window)
@@ -0,0 +1,223 @@
+import argparse
+import csv
+import gzip
+import os
+import sqlite3
+import threading
+
+from database import DEFAULT_DB_PATH, DECKS_DIR, MAIN_DECK, deck_schema
+
+# Pages copied per backup step. Small steps keep the source lock short so a
+# running practice session can keep writing between steps.
+BACKUP_PAGES_PER_STEP = 64
+BACKUP_STEP_SLEEP = 0.005
+
+# Learner data that can be exported and imported again.
+EXPORT_TABLES = ('progress', 'response_history', 'response_daily', 'events')
+BATCH_SIZE = 5000
+
+
+def deck_files(db_path=DEFAULT_DB_PATH):
+    """(name, path) of the decks registered in the app database whose files exist."""
+    conn = sqlite3.connect(db_path)
+    try:
+        if not conn.execute("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'decks'").fetchone():
+            return []
+        rows = conn.execute('SELECT name, path FROM decks ORDER BY name').fetchall()
+    finally:
+        conn.close()
+    return [(name, path) for name, path in rows if os.path.exists(path)]
+
+
+def deck_backup_path(dest_path, name):
+    """Where the backup of deck `name` goes next to the backup of the app database at `dest_path`."""
+    root, ext = os.path.splitext(dest_path)
+    return f'{root}-{deck_schema(name)}{ext or ".db"}'
+
+
+def backup_file(dest_path, src_path, pages=BACKUP_PAGES_PER_STEP, sleep=BACKUP_STEP_SLEEP, progress=None):
+    src = sqlite3.connect(src_path)
+    dest = sqlite3.connect(dest_path)
+    try:
+        src.backup(dest, pages=pages, progress=progress, sleep=sleep)
+    finally:
+        dest.close()
+        src.close()
+
+
+def backup_database(dest_path, src_path=DEFAULT_DB_PATH, pages=BACKUP_PAGES_PER_STEP,
+                    sleep=BACKUP_STEP_SLEEP, progress=None):
+    """
+    Copy the database to `dest_path` while it is in use, a few pages at a time, and
+    every deck file it registers to `deck_backup_path(dest_path, name)`.
+    `progress(status, remaining, total)` is called after every step.
+    Returns the paths written.
+    """
+    backup_file(dest_path, src_path, pages, sleep, progress)
+    written = [dest_path]
+    for name, path in deck_files(src_path):
+        written.append(deck_backup_path(dest_path, name))
+        backup_file(written[-1], path, pages, sleep, progress)
+    return written
+
+
+def start_backup(dest_path, src_path=DEFAULT_DB_PATH, on_done=None):
+    """Run `backup_database` on a background thread and return the thread."""
+    def run():
+        error = None
+        try:
+            backup_database(dest_path, src_path)
+        except sqlite3.Error as e:
+            error = e
+        if on_done:
+            on_done(error)
+
+    thread = threading.Thread(target=run, name='vocab-backup', daemon=True)
+    thread.start()
+    return thread
+
+
+def export_path(out_dir, table):
+    return os.path.join(out_dir, f'{table}.csv.gz')
+
+
+def table_columns(conn, table):
+    """Return the column names of `table` and the names of its primary key columns."""
+    info = conn.execute(f'PRAGMA table_info({table})').fetchall()
+    columns = [column[1] for column in info]
+    primary_key = [column[1] for column in sorted(info, key=lambda column: column[5]) if column[5]]
+    return columns, primary_key
+
+
+def export_table(conn, table, path, batch_size=BATCH_SIZE):
+    """Stream `table` into a gzipped CSV file. Returns the number of rows written."""
+    columns, _ = table_columns(conn, table)
+    cursor = conn.execute(f'SELECT {", ".join(columns)} FROM {table}')
+    count = 0
+    with gzip.open(path, 'wt', encoding='utf-8', newline='') as f:
+        writer = csv.writer(f)
+        writer.writerow(columns)
+        while True:
+            rows = cursor.fetchmany(batch_size)
+            if not rows:
+                break
+            writer.writerows(rows)
+            count += len(rows)
+    return count
+
+
+def import_table(conn, table, path, batch_size=BATCH_SIZE):
+    """
+    Load a gzipped CSV written by `export_table` into `table`.
+    Rows with an existing primary key replace the stored values.
+    """
+    table_cols, primary_key = table_columns(conn, table)
+    count = 0
+    with gzip.open(path, 'rt', encoding='utf-8', newline='') as f:
+        reader = csv.reader(f)
+        header = next(reader)
+        columns = [column for column in header if column in table_cols]
+        indexes = [header.index(column) for column in columns]
+        updates = ', '.join(f'{column} = excluded.{column}' for column in columns if column not in primary_key)
+        sql = f'''
+            INSERT INTO {table} ({", ".join(columns)})
+            VALUES ({", ".join("?" for _ in columns)})
+            ON CONFLICT({", ".join(primary_key)}) DO UPDATE SET {updates}
+        '''
+
+        batch = []
+        for row in reader:
+            # CSV has no NULL, so empty fields are read back as NULL
+            batch.append([row[i] if row[i] != '' else None for i in indexes])
+            if len(batch) >= batch_size:
+                conn.executemany(sql, batch)
+                conn.commit()
+                count += len(batch)
+                batch = []
+        if batch:
+            conn.executemany(sql, batch)
+            conn.commit()
+            count += len(batch)
+    return count
+
+
+def deck_export_dir(out_dir, name):
+    return os.path.join(out_dir, DECKS_DIR, deck_schema(name))
+
+
+def export_file(out_dir, db_path):
+    os.makedirs(out_dir, exist_ok=True)
+    conn = sqlite3.connect(db_path)
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        return {table: export_table(conn, table, export_path(out_dir, table))
+                for table in EXPORT_TABLES if table in existing}
+    finally:
+        conn.close()
+
+
+def import_file(in_dir, db_path):
+    conn = sqlite3.connect(db_path)
+    try:
+        existing = {row[0] for row in conn.execute("SELECT name FROM sqlite_master WHERE type = 'table'")}
+        counts = {}
+        for table in EXPORT_TABLES:
+            path = export_path(in_dir, table)
+            if table in existing and os.path.exists(path):
+                counts[table] = import_table(conn, table, path)
+        return counts
+    finally:
+        conn.close()
+
+
+def export_learner_data(out_dir, db_path=DEFAULT_DB_PATH):
+    """
+    Export every table in EXPORT_TABLES to `out_dir`, and those of each registered
+    deck to `deck_export_dir(out_dir, name)`. Returns {deck: {table: rows}}.
+    """
+    counts = {MAIN_DECK: export_file(out_dir, db_path)}
+    for name, path in deck_files(db_path):
+        counts[name] = export_file(deck_export_dir(out_dir, name), path)
+    return counts
+
+
+def import_learner_data(in_dir, db_path=DEFAULT_DB_PATH):
+    """
+    Import the files written by `export_learner_data` from `in_dir`. A deck is only
+    imported if it is registered in the app database and has been used once.
+    Returns {deck: {table: rows}}.
+    """
+    counts = {MAIN_DECK: import_file(in_dir, db_path)}
+    for name, path in deck_files(db_path):
+        deck_dir = deck_export_dir(in_dir, name)
+        if os.path.isdir(deck_dir):
+            counts[name] = import_file(deck_dir, path)
+    return counts
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Back up, export and import learner data.")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="Path of the app database.")
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('backup', help="Online copy of the database and every deck file.").add_argument('dest')
+    commands.add_parser('export', help="Export progress and history as gzipped CSV.").add_argument('out_dir')
+    commands.add_parser('import', help="Import a previous export.").add_argument('in_dir')
+    args = parser.parse_args()
+
+    if args.command == 'backup':
+        def report(status, remaining, total):
+            print(f"Backed up {total - remaining}/{total} pages", end='\r')
+        written = backup_database(args.dest, args.db, progress=report)
+        print(f"\nBackup written to {', '.join(written)}")
+    elif args.command == 'export':
+        for deck, counts in export_learner_data(args.out_dir, args.db).items():
+            for table, count in counts.items():
+                print(f"Exported {count} rows from {deck}.{table}")
+    else:
+        for deck, counts in import_learner_data(args.in_dir, args.db).items():
+            for table, count in counts.items():
+                print(f"Imported {count} rows into {deck}.{table}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,37 @@
+"""
+Time streak and recent-accuracy queries over the answer bitsets of a synthetic deck.
+
+    python benchmarks/bench_answer_history.py --words 100000 --repeat 100
+"""
+import argparse
+import os
+import random
+import sys
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from answer_history import AnswerHistory, HISTORY_BITS
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--words', type=int, default=100000)
+    parser.add_argument('--repeat', type=int, default=100)
+    args = parser.parse_args()
+
+    rows = [(word_id, random.getrandbits(64) - 2 ** 63, random.randint(0, HISTORY_BITS))
+            for word_id in range(1, args.words + 1)]
+    history = AnswerHistory(rows)
+
+    for name, query in (('streaks', history.streaks),
+                        ('recent accuracy', history.recent_accuracy)):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            query()
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"{name} of {args.words} words: {elapsed * 1000:.2f}ms")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,129 @@
+"""
+Time practice writes while progress views are read at the same time, in three setups:
+
+    shared    reads and writes queued on the one DatabaseWorker connection (before WAL)
+    rollback  reads on a ReaderPool, but the store kept in the old rollback-journal mode
+    wal       reads on a ReaderPool with the store in WAL mode (what the app does)
+
+    python benchmarks/bench_concurrent_reads.py --words 20000 --answers 300 --readers 2
+"""
+import argparse
+import os
+import random
+import sys
+import tempfile
+import threading
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from db_worker import DatabaseWorker, ReaderPool
+from spaced_repetition import QUALITY_CORRECT, QUALITY_INCORRECT
+
+SETUPS = ('shared', 'rollback', 'wal')
+
+
+def build_store(path, words, responses):
+    db = Database(path, vocabulary_file=None)
+    db.cursor.executemany(
+        'INSERT INTO words (spanish, english, level, introduced) VALUES (?, ?, ?, 1)',
+        ((f'palabra{i}', f'word{i}', 'A1') for i in range(words))
+    )
+    db.initialize_progress()
+    db.cursor.executemany(
+        'INSERT INTO response_history (word_id, response_date, correct) VALUES (?, ?, ?)',
+        ((random.randint(1, words), f'2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}',
+          random.random() < 0.8) for _ in range(responses))
+    )
+    db.conn.commit()
+    db.conn.close()
+
+
+def progress_view(db):
+    # What visualize_progress reads: deck totals and every word's progress and answer stats
+    stats = db.get_answer_stats()
+    words = [(word, db.get_word_progress(word[0]), stats.get(word[0])) for word in db.get_all_words()]
+    return db.get_deck_stats(), words
+
+
+def answer(db, word_id, correct):
+    db.log_response(word_id, correct)
+    db.apply_review(word_id, QUALITY_CORRECT if correct else QUALITY_INCORRECT, correct)
+
+
+def set_journal_mode(db, mode):
+    # Fetch the result so the statement finishes and lets go of its lock
+    return db.cursor.execute(f'PRAGMA journal_mode = {mode}').fetchone()
+
+
+def run_setup(setup, path, args):
+    writer = DatabaseWorker(lambda: Database(path, vocabulary_file=None))
+    if setup == 'rollback':
+        writer.submit(set_journal_mode, 'DELETE').result()
+    readers = writer if setup == 'shared' else ReaderPool(path, args.readers)
+
+    stop = threading.Event()
+    views = []
+
+    def read_loop():
+        while not stop.is_set():
+            start = time.perf_counter()
+            try:
+                readers.submit(progress_view).result()
+            except Exception:
+                continue
+            views.append(time.perf_counter() - start)
+
+    threads = [threading.Thread(target=read_loop) for _ in range(args.readers)]
+    for thread in threads:
+        thread.start()
+
+    latencies, errors = [], 0
+    began = time.perf_counter()
+    for _ in range(args.answers):
+        start = time.perf_counter()
+        try:
+            writer.submit(answer, random.randint(1, args.words), random.random() < 0.8).result()
+        except Exception:
+            errors += 1
+        latencies.append(time.perf_counter() - start)
+        time.sleep(args.think / 1000)
+
+    elapsed = time.perf_counter() - began
+    stop.set()
+    for thread in threads:
+        thread.join()
+    if readers is not writer:
+        readers.close()
+    if setup == 'rollback':
+        writer.submit(set_journal_mode, 'WAL').result()
+    writer.close()
+
+    latencies = np.array(latencies) * 1000
+    print(f"{setup:>8}: answer median {np.median(latencies):7.2f}ms, p99 {np.percentile(latencies, 99):8.2f}ms, "
+          f"worst {latencies.max():8.2f}ms, {errors} failed; "
+          f"{len(views) / elapsed:.1f} progress views/s, median {np.median(views) * 1000 if views else 0:.0f}ms")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--words', type=int, default=20000)
+    parser.add_argument('--responses', type=int, default=200000)
+    parser.add_argument('--answers', type=int, default=300)
+    parser.add_argument('--readers', type=int, default=2, help="threads opening progress views back to back")
+    parser.add_argument('--think', type=float, default=5, help="milliseconds between answers")
+    parser.add_argument('--setups', nargs='+', choices=SETUPS, default=SETUPS)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        path = os.path.join(workdir, 'bench.db')
+        build_store(path, args.words, args.responses)
+        for setup in args.setups:
+            run_setup(setup, path, args)
+
+
+if __name__ == '__main__':
+    main()
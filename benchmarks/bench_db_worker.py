@@ -0,0 +1,146 @@
+"""
+Compare how long the UI thread is blocked when database calls run inline
+versus through DatabaseWorker.
+
+Runs headless: a small `after()` event loop stands in for Tk, and the
+StallMonitor used by the app measures how late its 16 ms ticks fire.
+
+    python benchmarks/bench_db_worker.py --words 20000 --cards 200
+"""
+import argparse
+import heapq
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import Future
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from db_worker import DatabaseWorker, deliver
+from stall_monitor import StallMonitor
+
+
+class EventLoop:
+    """Minimal stand-in for the Tk main loop: just `after()` and `mainloop()`."""
+
+    def __init__(self):
+        self.timers = []
+        self.counter = 0
+        self.running = True
+
+    def after(self, ms, fn):
+        self.counter += 1
+        heapq.heappush(self.timers, (time.perf_counter() + ms / 1000, self.counter, fn))
+
+    def quit(self):
+        self.running = False
+
+    def mainloop(self):
+        while self.running and self.timers:
+            due, _, fn = heapq.heappop(self.timers)
+            delay = due - time.perf_counter()
+            if delay > 0:
+                time.sleep(delay)
+            fn()
+
+
+class InlineDatabase:
+    """Runs requests directly on the calling thread, like the app did before the worker."""
+
+    def __init__(self):
+        self.db = Database()
+
+    def submit(self, fn, *args):
+        future = Future()
+        future.set_result(fn(self.db, *args))
+        return future
+
+    def call(self, method, *args):
+        return self.submit(lambda db, *a: getattr(db, method)(*a), *args)
+
+    def close(self):
+        self.db.conn.close()
+
+
+def populate(n_words, n_responses):
+    db = Database()
+    db.cursor.executemany(
+        'INSERT INTO words (spanish, english, level, introduced) VALUES (?, ?, ?, 1)',
+        ((f'palabra{i}', f'word{i}', 'A1') for i in range(n_words))
+    )
+    db.initialize_progress()
+    word_ids = [row[0] for row in db.get_all_words()]
+    db.cursor.executemany(
+        "INSERT INTO response_history (word_id, response_date, correct) VALUES (?, date('now'), ?)",
+        ((random.choice(word_ids), random.randint(0, 1)) for _ in range(n_responses))
+    )
+    db.conn.commit()
+    db.conn.close()
+
+
+def run_session(store, n_cards):
+    """Replay the practice flow: fetch a card, build choices, log the answer, update progress."""
+    loop = EventLoop()
+    monitor = StallMonitor(loop)
+    monitor.start()
+    state = {'cards': 0, 'all_words': None}
+
+    def next_card():
+        if state['cards'] >= n_cards:
+            store.call('get_total_words')
+            deliver(loop, store.call('get_mastered_words'), lambda _: loop.quit())
+            return
+        state['cards'] += 1
+        deliver(loop, store.call('get_any_review_word'), show_card)
+
+    def show_card(word):
+        # Like the app, the word list for multiple-choice options is fetched once per session
+        if state['all_words'] is None:
+            deliver(loop, store.call('get_all_words'), lambda words: answer(word, words))
+        else:
+            answer(word, state['all_words'])
+
+    def answer(word, all_words):
+        state['all_words'] = all_words
+        store.call('log_response', word[1], random.random() < 0.8)
+        store.call('update_word_progress', word[1], 1, 0, 2.5, '2030-01-01', 0)
+        loop.after(0, next_card)
+
+    loop.after(0, next_card)
+    start = time.perf_counter()
+    loop.mainloop()
+    elapsed = time.perf_counter() - start
+    return elapsed, monitor.report()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--words', type=int, default=20000)
+    parser.add_argument('--responses', type=int, default=200000)
+    parser.add_argument('--cards', type=int, default=200)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vocab_app.db')
+    shutil.copy(source, os.path.join(workdir, 'vocab_app.db'))
+    os.chdir(workdir)
+    try:
+        populate(args.words, args.responses)
+        for name, factory in (('inline', InlineDatabase), ('worker', DatabaseWorker)):
+            store = factory()
+            elapsed, report = run_session(store, args.cards)
+            store.close()
+            print(f"{name:>6}: {args.cards} cards in {elapsed:.2f}s, "
+                  f"stalls >= 50ms: {report['stalls']}/{report['ticks']} ticks, "
+                  f"p99 {report['p99_ms']:.1f}ms, worst {report['worst_ms']:.1f}ms")
+    finally:
+        os.chdir('/')
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,39 @@
+"""
+Time the review-load forecast on a synthetic deck.
+
+    python benchmarks/bench_forecast.py --words 1000000 --days 90
+"""
+import argparse
+import os
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from forecast import forecast_reviews
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--words', type=int, default=1000000)
+    parser.add_argument('--days', type=int, default=90)
+    parser.add_argument('--recall-rate', type=float, default=0.85)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(1)
+    repetitions = rng.integers(0, 8, args.words)
+    interval = np.where(repetitions == 0, 1, rng.integers(1, 120, args.words))
+    ease_factor = rng.uniform(1.3, 2.8, args.words)
+    due_in = rng.integers(0, 60, args.words)
+
+    start = time.perf_counter()
+    counts = forecast_reviews(interval, ease_factor, repetitions, due_in, args.days, args.recall_rate)
+    elapsed = time.perf_counter() - start
+    print(f"{args.days}-day forecast for {args.words} words: {elapsed:.3f}s "
+          f"({counts.sum()} reviews, peak {counts.max()} on day {counts.argmax()})")
+
+
+if __name__ == '__main__':
+    main()
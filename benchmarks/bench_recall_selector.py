@@ -0,0 +1,50 @@
+"""
+Time RecallSelector picks on a synthetic deck of introduced words.
+
+    python benchmarks/bench_recall_selector.py --words 100000 --picks 2000
+"""
+import argparse
+import datetime
+import os
+import random
+import sys
+import time
+
+import numpy as np
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall_selector import RecallSelector
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--words', type=int, default=100000)
+    parser.add_argument('--picks', type=int, default=2000)
+    args = parser.parse_args()
+
+    today = datetime.date.today()
+    rows = []
+    for word_id in range(1, args.words + 1):
+        interval = random.randint(1, 60)
+        next_review_date = today + datetime.timedelta(days=random.randint(-10, interval))
+        rows.append((word_id, f'palabra{word_id}', f'word{word_id}', random.randint(0, 6), None,
+                     interval, 3, random.uniform(1.3, 2.8), next_review_date.isoformat()))
+
+    start = time.perf_counter()
+    selector = RecallSelector(rows)
+    build = time.perf_counter() - start
+
+    picks = []
+    for _ in range(args.picks):
+        start = time.perf_counter()
+        card = selector.next_card()
+        picks.append(time.perf_counter() - start)
+        selector.record_answer(card[1], random.random() < 0.8)
+    picks = np.array(picks) * 1000
+    print(f"{args.words} words: built in {build:.2f}s, pick median {np.median(picks):.3f}ms, "
+          f"p99 {np.percentile(picks, 99):.3f}ms, worst {picks.max():.3f}ms")
+
+
+if __name__ == '__main__':
+    main()
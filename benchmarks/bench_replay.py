@@ -0,0 +1,85 @@
+"""
+Time rebuilding progress from the event log on a synthetic history.
+
+Reviews are generated with sm2_review and written both to the event log and to
+progress, so the replay should report no differences.
+
+    python benchmarks/bench_replay.py --words 200000 --events 3000000 --workers 4
+"""
+import argparse
+import datetime
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from replay import replay
+from spaced_repetition import sm2_review
+
+
+def populate(n_words, n_events):
+    db = Database()
+    db.cursor.executemany(
+        'INSERT INTO words (spanish, english, level, introduced) VALUES (?, ?, ?, 1)',
+        ((f'palabra{i}', f'word{i}', 'A1') for i in range(n_words))
+    )
+    db.initialize_progress()
+    progress = {row[0]: row[1:] for row in db.cursor.execute(
+        'SELECT word_id, interval, repetitions, ease_factor, next_review_date, correct_answers FROM progress'
+    )}
+    word_ids = list(progress)
+
+    start = datetime.date.today() - datetime.timedelta(days=365)
+    days = sorted(random.randrange(365) for _ in range(n_events))
+    events = []
+    for day in days:
+        word_id = random.choice(word_ids)
+        correct = random.random() < 0.6
+        quality = 5 if correct else 2
+        review_date = start + datetime.timedelta(days=day)
+        progress[word_id] = sm2_review(progress[word_id], quality, correct, review_date)
+        events.append((word_id, review_date.isoformat(), quality, int(correct)))
+
+    db.cursor.executemany(
+        "INSERT INTO events (word_id, event_type, event_date, quality, correct) VALUES (?, 'review', ?, ?, ?)",
+        events
+    )
+    db.cursor.executemany(
+        'UPDATE progress SET interval = ?, repetitions = ?, ease_factor = ?, next_review_date = ?, '
+        'correct_answers = ? WHERE word_id = ?',
+        ((*state, word_id) for word_id, state in progress.items())
+    )
+    db.conn.commit()
+    db.conn.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--words', type=int, default=200000)
+    parser.add_argument('--events', type=int, default=3000000)
+    parser.add_argument('--workers', type=int, default=None)
+    args = parser.parse_args()
+
+    workdir = tempfile.mkdtemp()
+    source = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'vocab_app.db')
+    shutil.copy(source, os.path.join(workdir, 'vocab_app.db'))
+    os.chdir(workdir)
+    try:
+        populate(args.words, args.events)
+        start = time.perf_counter()
+        events, mismatches = replay('vocab_app.db', args.workers)
+        elapsed = time.perf_counter() - start
+        print(f"Replayed {events} events for {args.words} words in {elapsed:.2f}s "
+              f"({events / elapsed:,.0f} events/s), {len(mismatches)} mismatches")
+    finally:
+        os.chdir('/')
+        shutil.rmtree(workdir)
+
+
+if __name__ == '__main__':
+    main()
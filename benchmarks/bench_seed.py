@@ -0,0 +1,70 @@
+"""
+Time seeding the known levels of a large deck after a placement test, and check that
+deck_stats, review_calendar and the change log come out as a full rebuild would have them.
+
+    python benchmarks/bench_seed.py --words 300000 --levels 4
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+
+LEVELS = ('A1', 'A2', 'B1', 'B2', 'C1', 'C2')
+
+
+def stats(db):
+    db.cursor.execute('SELECT stat, value FROM deck_stats WHERE value != 0 ORDER BY stat')
+    deck_stats = db.cursor.fetchall()
+    db.cursor.execute('SELECT review_date, words FROM review_calendar ORDER BY review_date')
+    return deck_stats, db.cursor.fetchall()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--words', type=int, default=300000)
+    parser.add_argument('--levels', type=int, default=4, help="levels the learner knows (default: %(default)s)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        db = Database(os.path.join(workdir, 'seed.db'), vocabulary_file=None)
+        db.cursor.executemany(
+            'INSERT INTO words (spanish, english, level) VALUES (?, ?, ?)',
+            ((f'palabra{i}', f'word{i}', LEVELS[i * len(LEVELS) // args.words]) for i in range(args.words))
+        )
+        db.conn.commit()
+        # Some words already practised, as when the test is retaken
+        db.cursor.execute('UPDATE words SET introduced = 1 WHERE id % 50 = 0')
+        db.conn.commit()
+
+        start = time.perf_counter()
+        db.initialize_progress()
+        print(f"initialize_progress of {args.words} words: {time.perf_counter() - start:.2f}s")
+        db.cursor.execute('DELETE FROM progress WHERE word_id % 3 = 0')
+        db.conn.commit()
+
+        start = time.perf_counter()
+        seeded = db.seed_known_levels(list(LEVELS[:args.levels]))
+        print(f"seed_known_levels of {args.levels} levels: {time.perf_counter() - start:.2f}s ({seeded} words seeded)")
+
+        # Every word has its latest progress change, every introduced word its introduction,
+        # and the device's seq and clock have moved on by one for each change, up to the last
+        db.cursor.execute('''
+            SELECT s.seq, s.clock, MAX(c.seq), COUNT(*) FROM sync_state s JOIN changes c ON c.device_id = s.device_id
+        ''')
+        seq, clock, last, logged = db.cursor.fetchone()
+        db.cursor.execute("SELECT COUNT(*) FROM words WHERE introduced = 1")
+        introduced = db.cursor.fetchone()[0]
+        kept = stats(db)
+        db.rebuild_deck_stats()
+        consistent = kept == stats(db) and seq == clock == last and logged == args.words + introduced
+        print("deck_stats, review_calendar and change log consistent" if consistent else "INCONSISTENT")
+        db.conn.close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,44 @@
+"""
+Time opening fresh in-memory stores seeded from a snapshot of a populated database.
+
+    python benchmarks/bench_snapshot.py --words 20000 --stores 1000
+"""
+import argparse
+import os
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database, MEMORY_DB
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--words', type=int, default=20000)
+    parser.add_argument('--stores', type=int, default=1000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        snapshot = os.path.join(workdir, 'snapshot.db')
+        db = Database(MEMORY_DB, vocabulary_file=None)
+        db.cursor.executemany(
+            'INSERT INTO words (spanish, english, level) VALUES (?, ?, ?)',
+            ((f'palabra{i}', f'word{i}', 'A1') for i in range(args.words))
+        )
+        db.initialize_progress()
+        db.save_snapshot(snapshot)
+        db.conn.close()
+
+        start = time.perf_counter()
+        for _ in range(args.stores):
+            store = Database(MEMORY_DB, snapshot=snapshot)
+            store.conn.close()
+        elapsed = time.perf_counter() - start
+        print(f"{args.stores} stores with {args.words} words each: {elapsed:.2f}s "
+              f"({elapsed / args.stores * 1000:.2f}ms per store, {os.path.getsize(snapshot) // 1024} KiB snapshot)")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,104 @@
+"""
+Sync a day of practice between two devices through a local sync server, and report
+the bytes moved against the size of the database.
+
+    python benchmarks/bench_sync.py --words 5000 --history 200000 --answers 300
+"""
+import argparse
+import os
+import random
+import shutil
+import sys
+import tempfile
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database
+from spaced_repetition import QUALITY_CORRECT, QUALITY_INCORRECT
+from sync import SyncClient, sync
+from sync_server import serve
+
+
+def build_store(path, words, history):
+    db = Database(path, vocabulary_file=None)
+    db.cursor.executemany(
+        'INSERT INTO words (spanish, english, level, introduced) VALUES (?, ?, ?, 1)',
+        ((f'palabra{i}', f'word{i}', 'A1') for i in range(words))
+    )
+    db.initialize_progress()
+    db.cursor.executemany(
+        'INSERT INTO response_history (word_id, response_date, correct) VALUES (?, ?, ?)',
+        ((random.randint(1, words), f'2024-{random.randint(1, 12):02d}-{random.randint(1, 28):02d}',
+          random.random() < 0.8) for _ in range(history))
+    )
+    db.conn.commit()
+    db.conn.close()
+
+
+def practise(db, words, answers):
+    # A session works through a few dozen words, most of them answered several times
+    session = random.sample(range(1, words + 1), max(1, answers // 4))
+    for _ in range(answers):
+        word_id = random.choice(session)
+        correct = random.random() < 0.8
+        db.log_response(word_id, correct)
+        db.apply_review(word_id, QUALITY_CORRECT if correct else QUALITY_INCORRECT, correct)
+
+
+def run_sync(db, url, label):
+    client = SyncClient(url)
+    pushed, pulled, applied = sync(db, client)
+    print(f"{label}: pushed {pushed}, pulled {pulled} ({applied} new); "
+          f"sent {client.bytes_sent / 1024:.1f} KiB, received {client.bytes_received / 1024:.1f} KiB")
+    return client.bytes_sent + client.bytes_received
+
+
+def state(db):
+    db.cursor.execute('''
+        SELECT w.spanish, p.interval, p.repetitions, p.ease_factor, p.next_review_date, p.correct_answers
+        FROM progress p JOIN words w ON w.id = p.word_id ORDER BY w.spanish
+    ''')
+    progress = db.cursor.fetchall()
+    db.cursor.execute('SELECT COUNT(*) FROM response_history')
+    return progress, db.cursor.fetchone()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument('--words', type=int, default=5000)
+    parser.add_argument('--history', type=int, default=200000, help="responses already in the database")
+    parser.add_argument('--answers', type=int, default=300, help="answers per device in the day of practice")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as workdir:
+        laptop_path = os.path.join(workdir, 'laptop.db')
+        build_store(laptop_path, args.words, args.history)
+        # The desktop starts out as a copy of the laptop's file, as users carry it over today
+        desktop_path = os.path.join(workdir, 'desktop.db')
+        shutil.copy(laptop_path, desktop_path)
+
+        server = serve(0, os.path.join(workdir, 'server.db'))
+        url = f'http://127.0.0.1:{server.server_address[1]}'
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+
+        laptop = Database(laptop_path, vocabulary_file=None)
+        desktop = Database(desktop_path, vocabulary_file=None)
+        desktop.new_device_id()
+        run_sync(laptop, url, "first sync, laptop ")
+        run_sync(desktop, url, "first sync, desktop")
+
+        practise(laptop, args.words, args.answers)
+        practise(desktop, args.words, args.answers)
+        moved = run_sync(laptop, url, "day sync, laptop   ")
+        moved += run_sync(desktop, url, "day sync, desktop  ")
+        moved += run_sync(laptop, url, "day sync, laptop   ")
+
+        size = os.path.getsize(laptop_path)
+        print(f"Day of practice moved {moved / 1024:.1f} KiB in total; the database is {size / 1024:.0f} KiB")
+        print("Devices agree" if state(laptop) == state(desktop) else "Devices DIFFER")
+        server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
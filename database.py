@@ -1,17 +1,239 @@
 import sqlite3
 import datetime
+import math
+import os
+import re
+import time
+import uuid
+
+from answer_history import AnswerHistory, HISTORY_BITS, RECENT_ANSWERS
+from spaced_repetition import sm2_review
+
+DEFAULT_DB_PATH = 'vocab_app.db'
+# Pass as the path for a store that lives only in memory, e.g. seeded from a snapshot
+MEMORY_DB = ':memory:'
+DEFAULT_VOCABULARY_FILE = 'vocabulary.csv'
+
+# Raw responses older than this are rolled into per-word daily totals, and older
+# events into one 'snapshot' event per word
+HISTORY_RETENTION_DAYS = 90
+# Words whose old events compact_history folds per step
+FOLD_BATCH_WORDS = 500
+# Tables compact_history works on
+COMPACTED_TABLES = ('response_history', 'response_daily', 'events', 'changes')
+# Event types that carry the progress values they set
+PROGRESS_EVENTS = ('init', 'seed', 'set', 'snapshot')
+
+# A word counts as mastered once progress.correct_answers reaches this
+MASTERY_THRESHOLD = 5
+
+# The deck stored in the app database itself; other decks live in their own files
+MAIN_DECK = 'main'
+DECKS_DIR = 'decks'
+
+# Triggers that keep deck_stats and review_calendar in step with words and progress.
+# Only introduced words are counted as due, matching get_due_words.
+# Created per deck schema; trigger bodies always refer to tables of their own schema.
+DECK_STATS_TRIGGERS = f'''
+    CREATE TRIGGER IF NOT EXISTS {{schema}}.deck_stats_word_insert AFTER INSERT ON words
+    BEGIN
+        UPDATE deck_stats SET value = value + 1 WHERE stat = 'total';
+        UPDATE deck_stats SET value = value + NEW.introduced WHERE stat = 'introduced';
+        INSERT INTO deck_stats (stat, value) VALUES ('level:' || COALESCE(NEW.level, ''), 1)
+            ON CONFLICT(stat) DO UPDATE SET value = value + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS {{schema}}.deck_stats_word_delete AFTER DELETE ON words
+    BEGIN
+        UPDATE deck_stats SET value = value - 1 WHERE stat = 'total';
+        UPDATE deck_stats SET value = value - OLD.introduced WHERE stat = 'introduced';
+        UPDATE deck_stats SET value = value - 1 WHERE stat = 'level:' || COALESCE(OLD.level, '');
+        UPDATE review_calendar SET words = words - 1
+            WHERE OLD.introduced = 1
+            AND review_date = (SELECT next_review_date FROM progress WHERE word_id = OLD.id);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS {{schema}}.deck_stats_word_introduced AFTER UPDATE OF introduced ON words
+    WHEN NEW.introduced != OLD.introduced
+    BEGIN
+        UPDATE deck_stats SET value = value + NEW.introduced - OLD.introduced WHERE stat = 'introduced';
+        INSERT INTO review_calendar (review_date, words)
+            SELECT next_review_date, NEW.introduced - OLD.introduced FROM progress WHERE word_id = NEW.id
+            ON CONFLICT(review_date) DO UPDATE SET words = words + excluded.words;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS {{schema}}.deck_stats_word_level AFTER UPDATE OF level ON words
+    WHEN NEW.level IS NOT OLD.level
+    BEGIN
+        UPDATE deck_stats SET value = value - 1 WHERE stat = 'level:' || COALESCE(OLD.level, '');
+        INSERT INTO deck_stats (stat, value) VALUES ('level:' || COALESCE(NEW.level, ''), 1)
+            ON CONFLICT(stat) DO UPDATE SET value = value + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS {{schema}}.deck_stats_progress_insert AFTER INSERT ON progress
+    BEGIN
+        UPDATE deck_stats SET value = value + (COALESCE(NEW.correct_answers, 0) >= {MASTERY_THRESHOLD})
+            WHERE stat = 'mastered';
+        INSERT INTO review_calendar (review_date, words)
+            SELECT NEW.next_review_date, 1 FROM words WHERE id = NEW.word_id AND introduced = 1
+            ON CONFLICT(review_date) DO UPDATE SET words = words + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS {{schema}}.deck_stats_progress_delete AFTER DELETE ON progress
+    BEGIN
+        UPDATE deck_stats SET value = value - (COALESCE(OLD.correct_answers, 0) >= {MASTERY_THRESHOLD})
+            WHERE stat = 'mastered';
+        UPDATE review_calendar SET words = words - 1
+            WHERE review_date = OLD.next_review_date
+            AND EXISTS (SELECT 1 FROM words WHERE id = OLD.word_id AND introduced = 1);
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS {{schema}}.deck_stats_progress_update AFTER UPDATE ON progress
+    BEGIN
+        UPDATE deck_stats
+            SET value = value + (COALESCE(NEW.correct_answers, 0) >= {MASTERY_THRESHOLD})
+                              - (COALESCE(OLD.correct_answers, 0) >= {MASTERY_THRESHOLD})
+            WHERE stat = 'mastered';
+        UPDATE review_calendar SET words = words - 1
+            WHERE review_date = OLD.next_review_date AND NEW.next_review_date IS NOT OLD.next_review_date
+            AND EXISTS (SELECT 1 FROM words WHERE id = NEW.word_id AND introduced = 1);
+        INSERT INTO review_calendar (review_date, words)
+            SELECT NEW.next_review_date, 1 FROM words
+            WHERE id = NEW.word_id AND introduced = 1 AND NEW.next_review_date IS NOT OLD.next_review_date
+            ON CONFLICT(review_date) DO UPDATE SET words = words + 1;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS {{schema}}.review_calendar_prune AFTER UPDATE ON review_calendar WHEN NEW.words = 0
+    BEGIN
+        DELETE FROM review_calendar WHERE review_date = NEW.review_date;
+    END;
+'''
+
+
+# Triggers that record every local change to progress, every new response and every word
+# introduced in `changes`, numbered per device (seq) and ordered across devices by a
+# Lamport clock; see sync.py.
+# Changes merged in from other devices are applied with sync_state.applying set, so they
+# are not recorded again as local ones.
+# Only the latest progress change of a word is kept: a local change is ordered after every
+# change seen so far, so it replaces the word's earlier ones.
+CHANGE_LOG_PROGRESS = '''
+    BEGIN
+        DELETE FROM changes WHERE kind = 'progress' AND word_id = NEW.word_id;
+        UPDATE sync_state SET seq = seq + 1, clock = clock + 1;
+        INSERT INTO changes (
+            device_id, seq, clock, kind, word_id,
+            interval, repetitions, ease_factor, next_review_date, correct_answers
+        )
+        SELECT device_id, seq, clock, 'progress', NEW.word_id,
+               NEW.interval, NEW.repetitions, NEW.ease_factor, NEW.next_review_date, NEW.correct_answers
+        FROM sync_state;
+    END;
+'''
+CHANGE_LOG_TRIGGERS = f'''
+    CREATE TRIGGER IF NOT EXISTS {{schema}}.change_log_progress_insert AFTER INSERT ON progress
+    WHEN (SELECT applying FROM sync_state) = 0
+    {CHANGE_LOG_PROGRESS}
+
+    CREATE TRIGGER IF NOT EXISTS {{schema}}.change_log_progress_update AFTER UPDATE ON progress
+    WHEN (SELECT applying FROM sync_state) = 0
+    {CHANGE_LOG_PROGRESS}
+
+    CREATE TRIGGER IF NOT EXISTS {{schema}}.change_log_response_insert AFTER INSERT ON response_history
+    WHEN (SELECT applying FROM sync_state) = 0
+    BEGIN
+        UPDATE sync_state SET seq = seq + 1, clock = clock + 1;
+        INSERT INTO changes (device_id, seq, clock, kind, word_id, response_date, correct)
+        SELECT device_id, seq, clock, 'response', NEW.word_id, NEW.response_date, NEW.correct
+        FROM sync_state;
+    END;
+
+    CREATE TRIGGER IF NOT EXISTS {{schema}}.change_log_word_introduced AFTER UPDATE OF introduced ON words
+    WHEN NEW.introduced = 1 AND OLD.introduced = 0 AND (SELECT applying FROM sync_state) = 0
+    BEGIN
+        UPDATE sync_state SET seq = seq + 1, clock = clock + 1;
+        INSERT INTO changes (device_id, seq, clock, kind, word_id)
+        SELECT device_id, seq, clock, 'introduced', NEW.id
+        FROM sync_state;
+    END;
+'''
+
+
+def deck_schema(name):
+    """Schema name a deck is attached under."""
+    return MAIN_DECK if name == MAIN_DECK else 'deck_' + re.sub(r'\W', '_', name)
+
 
 class Database:
-    def __init__(self):
-        self.conn = sqlite3.connect('vocab_app.db')
+    def __init__(self, path=DEFAULT_DB_PATH, retention_days=HISTORY_RETENTION_DAYS, snapshot=None,
+                 vocabulary_file=DEFAULT_VOCABULARY_FILE, read_only=False, **connect_options):
+        """
+        Open the store at `path` (MEMORY_DB for one that is never written to disk).
+        `connect_options` go to sqlite3.connect, e.g. timeout or check_same_thread.
+        A `snapshot` database file is copied in first with the backup API, replacing what
+        `path` held. The deck is filled from `vocabulary_file` only if it has no words;
+        pass None to start with an empty deck instead.
+
+        A `read_only` store opens an existing database file for queries only: it creates
+        and loads nothing, and attaches decks read-only. See db_worker.ReaderPool.
+        """
+        self.read_only = read_only
+        if read_only:
+            self.conn = sqlite3.connect(f'file:{path}?mode=ro', uri=True, **connect_options)
+        else:
+            self.conn = sqlite3.connect(path, **connect_options)
         self.cursor = self.conn.cursor()
-        self.create_tables()
-        self.load_vocabulary_if_needed()
+        if snapshot is not None:
+            self.load_snapshot(snapshot)
+        self.retention_days = retention_days
+        # Schema of the active deck; every word, progress and history query is scoped to it
+        self.deck = MAIN_DECK
+        # Deck name -> schema for every deck attached so far
+        self.attached_decks = {MAIN_DECK: MAIN_DECK}
+        # Schema -> AnswerHistory, loaded on first use and kept in step by log_response
+        self.answer_histories = {}
+        if read_only:
+            self.create_deck_views()
+            return
+        self.create_tables(MAIN_DECK)
+        self.cursor.execute('''
+            CREATE TABLE IF NOT EXISTS decks (
+                name TEXT PRIMARY KEY,
+                path TEXT,
+                vocabulary_file TEXT
+            )
+        ''')
+        self.create_deck_views()
+        if vocabulary_file is not None:
+            self.load_vocabulary_if_needed(vocabulary_file)
+
+    def load_snapshot(self, snapshot):
+        """Replace the whole store with a copy of the database file `snapshot`."""
+        source = sqlite3.connect(f'file:{snapshot}?mode=ro', uri=True)
+        try:
+            source.backup(self.conn)
+        finally:
+            source.close()
+
+    def save_snapshot(self, path):
+        """Write the store (the main database, not attached decks) to the file `path`, to seed stores from later."""
+        self.conn.commit()
+        dest = sqlite3.connect(path)
+        try:
+            self.conn.backup(dest)
+        finally:
+            dest.close()
+
+    def create_tables(self, schema):
+        # Only takes effect on a new database file; lets compaction give pages back to the OS.
+        # Must come before the switch to WAL, which writes the file header.
+        self.cursor.execute(f'PRAGMA {schema}.auto_vacuum = INCREMENTAL')
+        # Readers then work from a snapshot and never block writes, nor writes them (no effect in memory)
+        self.cursor.execute(f'PRAGMA {schema}.journal_mode = WAL').fetchone()
 
-    def create_tables(self):
         # Create the tables with an `introduced` column if it does not exist
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS words (
+        self.cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {schema}.words (
                 id INTEGER PRIMARY KEY AUTOINCREMENT,
                 spanish TEXT,
                 english TEXT,
@@ -19,13 +241,18 @@ class Database:
                 theme TEXT,
                 image_path TEXT,
                 introduced INTEGER DEFAULT 0,
-                correct_answers INTEGER DEFAULT 0
+                correct_answers INTEGER DEFAULT 0,
+                answer_bits INTEGER DEFAULT 0,
+                answer_count INTEGER DEFAULT 0
             )
         ''')
 
+        # Difficulty index: lets the placement test seek to a word of a given level
+        self.cursor.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_words_level ON words (level, id)')
+
         # Create the progress table
-        self.cursor.execute('''
-            CREATE TABLE IF NOT EXISTS progress (
+        self.cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {schema}.progress (
                 word_id INTEGER PRIMARY KEY,
                 interval INTEGER,
                 repetitions INTEGER,
@@ -36,8 +263,8 @@ class Database:
         ''')
 
         # Create response_history table for tracking individual responses
-        self.cursor.execute('''
-             CREATE TABLE IF NOT EXISTS response_history (
+        self.cursor.execute(f'''
+             CREATE TABLE IF NOT EXISTS {schema}.response_history (
                  id INTEGER PRIMARY KEY AUTOINCREMENT,
                  word_id INTEGER,
                  response_date TEXT,
@@ -45,44 +272,386 @@ class Database:
                  FOREIGN KEY(word_id) REFERENCES words(id)
              )
          ''')
+        self.cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS {schema}.idx_response_history_word
+            ON response_history (word_id, response_date)
+        ''')
+        self.cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS {schema}.idx_response_history_date
+            ON response_history (response_date)
+        ''')
+
+        # Daily per-word totals of responses that were compacted out of response_history
+        self.cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {schema}.response_daily (
+                word_id INTEGER,
+                response_date TEXT,
+                correct_count INTEGER,
+                incorrect_count INTEGER,
+                PRIMARY KEY (word_id, response_date),
+                FOREIGN KEY(word_id) REFERENCES words(id)
+            )
+        ''')
         self.conn.commit()
 
         # Check if the 'correct_answers' column is missing and add it if necessary
-        self.cursor.execute("PRAGMA table_info(progress)")
+        self.cursor.execute(f"PRAGMA {schema}.table_info(progress)")
         columns = [column[1] for column in self.cursor.fetchall()]
         if 'correct_answers' not in columns:
-            self.cursor.execute("ALTER TABLE progress ADD COLUMN correct_answers INTEGER DEFAULT 0")
+            self.cursor.execute(f"ALTER TABLE {schema}.progress ADD COLUMN correct_answers INTEGER DEFAULT 0")
 
+        # Last HISTORY_BITS outcomes of each word as a bitset, newest in the lowest bit (see answer_history.py)
+        self.cursor.execute(f"PRAGMA {schema}.table_info(words)")
+        columns = [column[1] for column in self.cursor.fetchall()]
+        if 'answer_bits' not in columns:
+            self.cursor.execute(f"ALTER TABLE {schema}.words ADD COLUMN answer_bits INTEGER DEFAULT 0")
+            self.cursor.execute(f"ALTER TABLE {schema}.words ADD COLUMN answer_count INTEGER DEFAULT 0")
+            # Fill in from the raw responses; compacted days only have totals, not the order of answers
+            self.cursor.execute(f'''
+                UPDATE {schema}.words SET (answer_bits, answer_count) = (
+                    SELECT SUM(correct << (position - 1)), COUNT(*)
+                    FROM (
+                        SELECT COALESCE(correct, 0) AS correct, ROW_NUMBER() OVER (ORDER BY id DESC) AS position
+                        FROM {schema}.response_history h
+                        WHERE h.word_id = words.id
+                    )
+                    WHERE position <= {HISTORY_BITS}
+                )
+                WHERE id IN (SELECT word_id FROM {schema}.response_history)
+            ''')
+
+        # Summary counters kept up to date by triggers, so reports never scan the deck
+        self.cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {schema}.deck_stats (
+                stat TEXT PRIMARY KEY,
+                value INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        # Number of introduced words due on each date
+        self.cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {schema}.review_calendar (
+                review_date TEXT PRIMARY KEY,
+                words INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        self.cursor.execute(f'SELECT COUNT(*) FROM {schema}.deck_stats')
+        if self.cursor.fetchone()[0] == 0:
+            self.rebuild_deck_stats(schema)
+        self.cursor.executescript(DECK_STATS_TRIGGERS.format(schema=schema))
+
+        # Every change to progress, in order; replaying it rebuilds the progress table (see replay.py).
+        # 'review' events carry the answer, the others the progress values they set.
+        self.cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {schema}.events (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                word_id INTEGER,
+                event_type TEXT,
+                event_date TEXT,
+                quality INTEGER,
+                correct INTEGER,
+                interval INTEGER,
+                repetitions INTEGER,
+                ease_factor REAL,
+                next_review_date TEXT,
+                correct_answers INTEGER
+            )
+        ''')
+        self.cursor.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_events_word ON events (word_id, id)')
+        # Events compact_history has yet to fold, by date
+        self.cursor.execute(f'''
+            CREATE INDEX IF NOT EXISTS {schema}.idx_events_unfolded ON events (event_date, word_id)
+            WHERE event_type != 'snapshot'
+        ''')
+        self.cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {schema}.events)')
+        if not self.cursor.fetchone()[0]:
+            # Progress written before the event log existed becomes its starting point
+            self.cursor.execute(f'''
+                INSERT INTO {schema}.events (
+                    word_id, event_type, event_date,
+                    interval, repetitions, ease_factor, next_review_date, correct_answers
+                )
+                SELECT word_id, 'snapshot', ?, interval, repetitions, ease_factor, next_review_date, correct_answers
+                FROM {schema}.progress
+                ORDER BY word_id
+            ''', (datetime.date.today().isoformat(),))
+
+        # Change log for syncing between devices (see sync.py). This copy of the deck is one
+        # device: seq numbers its own changes, pushed_seq is how far the server has them and
+        # pulled_position how far into the server's log other devices' changes have been merged.
+        # sync_peers holds the highest seq merged from every other device.
+        self.cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {schema}.sync_state (
+                device_id TEXT NOT NULL,
+                seq INTEGER NOT NULL DEFAULT 0,
+                clock INTEGER NOT NULL DEFAULT 0,
+                pushed_seq INTEGER NOT NULL DEFAULT 0,
+                pulled_position INTEGER NOT NULL DEFAULT 0,
+                applying INTEGER NOT NULL DEFAULT 0
+            )
+        ''')
+        self.cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {schema}.changes (
+                device_id TEXT,
+                seq INTEGER,
+                clock INTEGER,
+                kind TEXT,
+                word_id INTEGER,
+                interval INTEGER,
+                repetitions INTEGER,
+                ease_factor REAL,
+                next_review_date TEXT,
+                correct_answers INTEGER,
+                response_date TEXT,
+                correct INTEGER,
+                PRIMARY KEY (device_id, seq)
+            )
+        ''')
+        self.cursor.execute(f'CREATE INDEX IF NOT EXISTS {schema}.idx_changes_word ON changes (kind, word_id, clock)')
+        self.cursor.execute(f'''
+            CREATE TABLE IF NOT EXISTS {schema}.sync_peers (
+                device_id TEXT PRIMARY KEY,
+                seq INTEGER NOT NULL
+            )
+        ''')
+        self.cursor.execute(f'SELECT EXISTS (SELECT 1 FROM {schema}.sync_state)')
+        if not self.cursor.fetchone()[0]:
+            device_id = uuid.uuid4().hex
+            # Progress and introduced words from before the change log are the first things this
+            # device shares. Older responses stay local: a copy of this file elsewhere would send them again.
+            self.cursor.execute(f'''
+                INSERT INTO {schema}.changes (
+                    device_id, seq, clock, kind, word_id,
+                    interval, repetitions, ease_factor, next_review_date, correct_answers
+                )
+                SELECT ?, ROW_NUMBER() OVER (ORDER BY word_id), ROW_NUMBER() OVER (ORDER BY word_id), 'progress', word_id,
+                       interval, repetitions, ease_factor, next_review_date, correct_answers
+                FROM {schema}.progress
+            ''', (device_id,))
+            self.cursor.execute(f'''
+                INSERT INTO {schema}.changes (device_id, seq, clock, kind, word_id)
+                SELECT ?, seq, seq, 'introduced', id
+                FROM (
+                    SELECT id, (SELECT COUNT(*) FROM {schema}.changes) + ROW_NUMBER() OVER (ORDER BY id) AS seq
+                    FROM {schema}.words
+                    WHERE introduced = 1
+                )
+            ''', (device_id,))
+            self.cursor.execute(f'''
+                INSERT INTO {schema}.sync_state (device_id, seq, clock)
+                SELECT ?, COUNT(*), COUNT(*) FROM {schema}.changes
+            ''', (device_id,))
+        self.cursor.execute(f"SELECT sql FROM {schema}.sqlite_master WHERE name = 'change_log_progress_insert'")
+        trigger = self.cursor.fetchone()
+        if trigger and 'DELETE' not in trigger[0]:
+            # Triggers from before progress changes replaced the word's earlier ones
+            self.cursor.execute(f'DROP TRIGGER {schema}.change_log_progress_insert')
+            self.cursor.execute(f'DROP TRIGGER {schema}.change_log_progress_update')
+            self.cursor.execute(f'''
+                DELETE FROM {schema}.changes
+                WHERE kind = 'progress'
+                AND EXISTS (
+                    SELECT 1 FROM {schema}.changes later
+                    WHERE later.kind = 'progress' AND later.word_id = changes.word_id
+                    AND (later.clock > changes.clock OR (later.clock = changes.clock AND later.device_id > changes.device_id))
+                )
+            ''')
+        self.cursor.executescript(CHANGE_LOG_TRIGGERS.format(schema=schema))
 
         # Commit all changes
         self.conn.commit()
 
-    def get_due_words(self):
-        today = datetime.date.today().isoformat()
+    def add_deck(self, name, vocabulary_file, path=None):
+        """Register a deck kept in its own database file. Nothing is read until the deck is used."""
+        if name == MAIN_DECK:
+            raise ValueError(f"'{MAIN_DECK}' is the name of the built-in deck")
+        path = path or os.path.join(DECKS_DIR, f'{deck_schema(name)}.db')
+        # Names differing only in punctuation share a schema (and default file), e.g. "my deck" and "my-deck"
+        self.cursor.execute('SELECT name, path FROM main.decks WHERE name != ?', (name,))
+        for other, other_path in self.cursor.fetchall():
+            if deck_schema(other) == deck_schema(name):
+                raise ValueError(f"Deck name '{name}' is too similar to the existing deck '{other}'")
+            if os.path.abspath(other_path) == os.path.abspath(path):
+                raise ValueError(f"Deck '{other}' is already stored in {path}")
         self.cursor.execute('''
-            SELECT 'due' AS word_type, w.id, w.spanish, w.english, w.correct_answers, w.image_path,
+            INSERT OR IGNORE INTO main.decks (name, path, vocabulary_file)
+            VALUES (?, ?, ?)
+        ''', (name, path, vocabulary_file))
+        self.conn.commit()
+
+    def get_decks(self):
+        self.cursor.execute('SELECT name FROM main.decks ORDER BY name')
+        return [MAIN_DECK] + [row[0] for row in self.cursor.fetchall()]
+
+    def get_deck_files(self):
+        """(name, path) of every registered deck other than the built-in one."""
+        self.cursor.execute('SELECT name, path FROM main.decks ORDER BY name')
+        return self.cursor.fetchall()
+
+    def use_deck(self, name):
+        """
+        Make `name` the active deck, attaching its file. The deck it replaces is detached
+        again, so only the built-in deck and the active one are ever attached.
+        """
+        previous = next(deck for deck, schema in self.attached_decks.items() if schema == self.deck)
+        self.deck = self.attach_deck(name)
+        if previous not in (MAIN_DECK, name):
+            self.detach_deck(previous)
+        # The built-in deck's vocabulary is loaded on opening
+        if name != MAIN_DECK and not self.read_only:
+            self.cursor.execute('SELECT vocabulary_file FROM main.decks WHERE name = ?', (name,))
+            self.load_vocabulary_if_needed(self.cursor.fetchone()[0])
+
+    def attach_deck(self, name):
+        """Attach the file of deck `name` if it is not yet, and return its schema. The active deck stays as it is."""
+        if name in self.attached_decks:
+            return self.attached_decks[name]
+
+        self.cursor.execute('SELECT path FROM main.decks WHERE name = ?', (name,))
+        row = self.cursor.fetchone()
+        if row is None:
+            raise ValueError(f"Unknown deck: {name}")
+        path = row[0]
+        schema = deck_schema(name)
+        if self.read_only:
+            self.cursor.execute(f'ATTACH DATABASE ? AS {schema}', (f'file:{path}?mode=ro',))
+            self.attached_decks[name] = schema
+            self.create_deck_views()
+            return schema
+        if os.path.dirname(path):
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+
+        # ATTACH is not allowed inside a transaction
+        self.conn.commit()
+        self.cursor.execute(f'ATTACH DATABASE ? AS {schema}', (path,))
+        self.create_tables(schema)
+        self.attached_decks[name] = schema
+        self.create_deck_views()
+        return schema
+
+    def detach_deck(self, name):
+        """Detach the file of deck `name`, which must not be the active deck."""
+        schema = self.attached_decks.pop(name)
+        self.answer_histories.pop(schema, None)
+        # DETACH is not allowed inside a transaction either
+        self.conn.commit()
+        self.cursor.execute(f'DETACH DATABASE {schema}')
+        self.create_deck_views()
+
+    def create_deck_views(self):
+        """Cross-deck views that combine every attached deck with UNION ALL."""
+        views = {
+            'words': 'id, spanish, english, level, image_path, introduced',
+            'progress': 'word_id, interval, repetitions, ease_factor, next_review_date, correct_answers',
+            'deck_stats': 'stat, value',
+        }
+        for table, columns in views.items():
+            selects = ' UNION ALL '.join(
+                f"SELECT '{schema}' AS deck, {columns} FROM {schema}.{table}"
+                for schema in self.attached_decks.values()
+            )
+            self.cursor.execute(f'DROP VIEW IF EXISTS temp.all_{table}')
+            self.cursor.execute(f'CREATE TEMP VIEW all_{table} AS {selects}')
+        self.conn.commit()
+
+    def get_attached_deck_totals(self):
+        """(deck name, total words, mastered words) for every attached deck."""
+        self.cursor.execute('''
+            SELECT deck,
+                   SUM(CASE WHEN stat = 'total' THEN value ELSE 0 END),
+                   SUM(CASE WHEN stat = 'mastered' THEN value ELSE 0 END)
+            FROM all_deck_stats
+            GROUP BY deck
+        ''')
+        names = {schema: name for name, schema in self.attached_decks.items()}
+        return [(names[schema], total, mastered) for schema, total, mastered in self.cursor.fetchall()]
+
+    def rebuild_deck_stats(self, schema=None):
+        """Recompute deck_stats and review_calendar from scratch."""
+        schema = schema or self.deck
+        self.cursor.execute(f'DELETE FROM {schema}.deck_stats')
+        self.cursor.execute(f'DELETE FROM {schema}.review_calendar')
+        self.cursor.execute(f'''
+            INSERT INTO {schema}.deck_stats (stat, value)
+            SELECT 'total', COUNT(*) FROM {schema}.words
+            UNION ALL
+            SELECT 'introduced', COALESCE(SUM(introduced), 0) FROM {schema}.words
+            UNION ALL
+            SELECT 'mastered', COUNT(*) FROM {schema}.progress WHERE correct_answers >= ?
+            UNION ALL
+            SELECT 'level:' || COALESCE(level, ''), COUNT(*) FROM {schema}.words GROUP BY level
+        ''', (MASTERY_THRESHOLD,))
+        self.cursor.execute(f'''
+            INSERT INTO {schema}.review_calendar (review_date, words)
+            SELECT p.next_review_date, COUNT(*)
+            FROM {schema}.progress p
+            JOIN {schema}.words w ON w.id = p.word_id
+            WHERE w.introduced = 1
+            GROUP BY p.next_review_date
+        ''')
+        self.conn.commit()
+
+    def get_due_words(self, limit=-1):
+        today = datetime.date.today().isoformat()
+        self.cursor.execute(f'''
+            SELECT 'due' AS word_type, w.id, w.spanish, w.english, p.correct_answers, w.image_path,
                    p.interval, p.repetitions, p.ease_factor, p.next_review_date
-            FROM words w
-            JOIN progress p ON w.id = p.word_id
+            FROM {self.deck}.words w
+            JOIN {self.deck}.progress p ON w.id = p.word_id
             WHERE w.introduced = 1 AND p.next_review_date <= ?
-        ''', (today,))
+            ORDER BY p.next_review_date
+            LIMIT ?
+        ''', (today, limit))
+        return self.cursor.fetchall()
+
+    def get_review_words(self, limit):
+        """Introduced words that are not due yet, in random order, to fill a session once due words run out."""
+        today = datetime.date.today().isoformat()
+        self.cursor.execute(f'''
+            SELECT 'due' AS word_type, w.id, w.spanish, w.english, COALESCE(p.correct_answers, 0), w.image_path
+            FROM {self.deck}.words w
+            LEFT JOIN {self.deck}.progress p ON w.id = p.word_id
+            WHERE w.introduced = 1 AND (p.next_review_date IS NULL OR p.next_review_date > ?)
+            ORDER BY RANDOM()
+            LIMIT ?
+        ''', (today, limit))
+        return self.cursor.fetchall()
+
+    def get_recall_features(self):
+        """Introduced words with their progress (None if they have none yet), for RecallSelector."""
+        self.cursor.execute(f'''
+            SELECT w.id, w.spanish, w.english, COALESCE(p.correct_answers, 0), w.image_path,
+                   p.interval, p.repetitions, p.ease_factor, p.next_review_date
+            FROM {self.deck}.words w
+            LEFT JOIN {self.deck}.progress p ON w.id = p.word_id
+            WHERE w.introduced = 1
+        ''')
         return self.cursor.fetchall()
 
     def get_new_word(self):
-        self.cursor.execute('''
+        self.cursor.execute(f'''
             SELECT 'new' AS word_type, id, spanish, english, 0 AS correct_answers, image_path
-            FROM words
+            FROM {self.deck}.words
             WHERE introduced = 0
             LIMIT 1
         ''')
         return self.cursor.fetchone()
 
+    def get_new_words(self, limit):
+        self.cursor.execute(f'''
+            SELECT 'new' AS word_type, id, spanish, english, 0 AS correct_answers, image_path
+            FROM {self.deck}.words
+            WHERE introduced = 0
+            LIMIT ?
+        ''', (limit,))
+        return self.cursor.fetchall()
+
     def get_words_in_session(self):
-        self.cursor.execute('''
-            SELECT 'in_session' AS word_type, id, spanish, english, correct_answers, image_path
-            FROM words
-            WHERE introduced = 1 AND correct_answers < 5
-        ''')
+        self.cursor.execute(f'''
+            SELECT 'in_session' AS word_type, w.id, w.spanish, w.english, COALESCE(p.correct_answers, 0), w.image_path
+            FROM {self.deck}.words w
+            LEFT JOIN {self.deck}.progress p ON w.id = p.word_id
+            WHERE w.introduced = 1 AND COALESCE(p.correct_answers, 0) < ?
+        ''', (MASTERY_THRESHOLD,))
         return self.cursor.fetchall()
 
 
@@ -90,108 +659,433 @@ class Database:
 
     def mark_word_as_introduced(self, word_id):
         """Mark a word as introduced so it is not treated as a new word again."""
-        self.cursor.execute('''
-            UPDATE words
+        self.cursor.execute(f'''
+            UPDATE {self.deck}.words
             SET introduced = 1
             WHERE id = ?
         ''', (word_id,))
         self.conn.commit()
 
     def log_response(self, word_id, correct):
+        self.add_response(word_id, datetime.date.today().isoformat(), correct)
+        self.conn.commit()
+        if self.deck in self.answer_histories:
+            self.answer_histories[self.deck].record(word_id, correct)
+
+    def add_response(self, word_id, response_date, correct):
+        """Record an answer in `response_history` and the word's answer bitset, without committing."""
         # Insert data into `response_history` without the `response` column
-        response_date = datetime.date.today().isoformat()
-        self.cursor.execute('''
-            INSERT INTO response_history (word_id, response_date, correct)
+        self.cursor.execute(f'''
+            INSERT INTO {self.deck}.response_history (word_id, response_date, correct)
             VALUES (?, ?, ?)
         ''', (word_id, response_date, int(correct)))
-        self.conn.commit()
+        # SQLite shifts are 64-bit, so the oldest outcome drops off the top
+        self.cursor.execute(f'''
+            UPDATE {self.deck}.words
+            SET answer_bits = (answer_bits << 1) | ?, answer_count = MIN(answer_count + 1, {HISTORY_BITS})
+            WHERE id = ?
+        ''', (int(correct), word_id))
 
-    def load_vocabulary_if_needed(self):
-        self.cursor.execute('SELECT COUNT(*) FROM words')
+    def get_answer_history(self):
+        """The recent answers of every word of the deck as an AnswerHistory. Use it on the database thread only."""
+        # A read-only store never sees log_response, so it reads the bitsets afresh every time
+        if self.deck not in self.answer_histories or self.read_only:
+            self.cursor.execute(f'SELECT id, answer_bits, answer_count FROM {self.deck}.words ORDER BY id')
+            self.answer_histories[self.deck] = AnswerHistory(self.cursor.fetchall())
+        return self.answer_histories[self.deck]
+
+    def get_answer_stats(self, window=RECENT_ANSWERS):
+        """Current streak and accuracy over the last `window` answers (None before any) of every word, by word id."""
+        history = self.get_answer_history()
+        accuracy = history.recent_accuracy(window)
+        return {
+            word_id: (streak, None if math.isnan(accuracy) else accuracy)
+            for word_id, streak, accuracy in zip(
+                history.word_ids.tolist(), history.streaks().tolist(), accuracy.tolist()
+            )
+        }
+
+    def load_vocabulary_if_needed(self, vocabulary_file):
+        self.cursor.execute(f'SELECT COUNT(*) FROM {self.deck}.words')
         count = self.cursor.fetchone()[0]
         if count == 0:
             from vocabulary import load_vocabulary
-            load_vocabulary('vocabulary.csv', self)
+            load_vocabulary(vocabulary_file, self)
             print("Vocabulary loaded successfully!")
 
+    def log_event(self, word_id, event_type, quality=None, correct=None, progress=(None,) * 5):
+        """Append to the event log. Left uncommitted so it lands in the same transaction as the change."""
+        self.cursor.execute(f'''
+            INSERT INTO {self.deck}.events (
+                word_id, event_type, event_date, quality, correct,
+                interval, repetitions, ease_factor, next_review_date, correct_answers
+            ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+        ''', (
+            word_id, event_type, datetime.date.today().isoformat(),
+            quality, None if correct is None else int(correct), *progress
+        ))
+
     def insert_progress(self, word_id, interval, repetitions, ease_factor, next_review_date, correct_answers):
-        self.cursor.execute('''
-            INSERT OR REPLACE INTO progress (
+        self.set_progress(word_id, (interval, repetitions, ease_factor, next_review_date, correct_answers))
+        self.conn.commit()
+
+    def set_progress(self, word_id, progress):
+        """Write a word's progress and log it as a 'set' event, without committing."""
+        interval, repetitions, ease_factor, next_review_date, correct_answers = progress
+        # An upsert rather than INSERT OR REPLACE, so the deck_stats update trigger sees the old row
+        self.cursor.execute(f'''
+            INSERT INTO {self.deck}.progress (
                 word_id, interval, repetitions, ease_factor, next_review_date, correct_answers
             ) VALUES (?, ?, ?, ?, ?, ?)
+            ON CONFLICT(word_id) DO UPDATE SET
+                interval = excluded.interval,
+                repetitions = excluded.repetitions,
+                ease_factor = excluded.ease_factor,
+                next_review_date = excluded.next_review_date,
+                correct_answers = excluded.correct_answers
         ''', (
             word_id, interval, repetitions, ease_factor, next_review_date, correct_answers
         ))
-        self.conn.commit()
+        self.log_event(word_id, 'set', progress=progress)
 
     def insert_word(self, word):
-        self.cursor.execute('''
-            INSERT INTO words (spanish, english, level, image_path)
+        self.cursor.execute(f'''
+            INSERT INTO {self.deck}.words (spanish, english, level, image_path)
             VALUES (?, ?, ?, ?)
         ''', (word.spanish, word.english, word.level, word.image_path))
         self.conn.commit()
+        self.answer_histories.pop(self.deck, None)
 
     def get_all_words(self):
-        self.cursor.execute('SELECT id, spanish, english, image_path FROM words')
+        self.cursor.execute(f'SELECT id, spanish, english, image_path FROM {self.deck}.words')
         return self.cursor.fetchall()
 
 
+    def get_review_schedule(self):
+        """interval, ease_factor, repetitions and days until next review for every introduced word."""
+        self.cursor.execute(f'''
+            SELECT COALESCE(p.interval, 1), COALESCE(p.ease_factor, 2.5), COALESCE(p.repetitions, 0),
+                   COALESCE(CAST(julianday(p.next_review_date) - julianday(?) AS INTEGER), 0)
+            FROM {self.deck}.progress p
+            JOIN {self.deck}.words w ON w.id = p.word_id
+            WHERE w.introduced = 1
+        ''', (datetime.date.today().isoformat(),))
+        return self.cursor.fetchall()
+
     def get_word_progress(self, word_id):
-        self.cursor.execute('''
+        self.cursor.execute(f'''
             SELECT interval, repetitions, ease_factor, next_review_date, correct_answers
-            FROM progress
+            FROM {self.deck}.progress
             WHERE word_id = ?
         ''', (word_id,))
         return self.cursor.fetchone()
 
     def update_word_progress(self, word_id, interval, repetitions, ease_factor, next_review_date, correct_answers):
-        self.cursor.execute('''
-            UPDATE progress
+        self.cursor.execute(f'''
+            UPDATE {self.deck}.progress
             SET interval = ?, repetitions = ?, ease_factor = ?, next_review_date = ?, correct_answers = ?
             WHERE word_id = ?
         ''', (interval, repetitions, ease_factor, next_review_date, correct_answers, word_id))
+        if self.cursor.rowcount:
+            self.log_event(
+                word_id, 'set', progress=(interval, repetitions, ease_factor, next_review_date, correct_answers)
+            )
+        self.conn.commit()
+
+    def apply_review(self, word_id, quality, correct):
+        """
+        Apply an answer to the word's progress with SM-2 and log it as a 'review' event.
+        Returns the new progress, or None if the word has no progress yet.
+        """
+        progress = self.get_word_progress(word_id)
+        if progress:
+            progress = sm2_review(progress, quality, correct, datetime.date.today())
+            self.cursor.execute(f'''
+                UPDATE {self.deck}.progress
+                SET interval = ?, repetitions = ?, ease_factor = ?, next_review_date = ?, correct_answers = ?
+                WHERE word_id = ?
+            ''', (*progress, word_id))
+        self.log_event(word_id, 'review', quality=quality, correct=correct)
         self.conn.commit()
+        return progress
+
+    def drop_row_triggers(self):
+        """
+        Drop the active deck's deck_stats and change log triggers for a bulk write, inside a
+        transaction; the write then keeps those tables up to date with set-based statements.
+        Returns the triggers for restore_row_triggers, to be called before committing.
+        """
+        if not self.conn.in_transaction:
+            self.cursor.execute('BEGIN')
+        self.cursor.execute(f'''
+            SELECT name, sql FROM {self.deck}.sqlite_master
+            WHERE type = 'trigger' AND (name LIKE 'deck_stats_%' OR name LIKE 'change_log_%')
+        ''')
+        triggers = self.cursor.fetchall()
+        for name, _ in triggers:
+            self.cursor.execute(f'DROP TRIGGER {self.deck}.{name}')
+        return triggers
+
+    def restore_row_triggers(self, triggers):
+        for name, sql in triggers:
+            # sqlite_master keeps the statement without the schema it was created in
+            self.cursor.execute(sql.replace(f'CREATE TRIGGER {name}', f'CREATE TRIGGER {self.deck}.{name}', 1))
+
+    def log_bulk_changes(self, kind, rows, params=()):
+        """
+        Append to the change log what the change_log triggers would for every row of `rows`, a SELECT
+        of (word_id, interval, repetitions, ease_factor, next_review_date, correct_answers).
+        The changes are numbered in word id order, each a step of the device's seq and clock.
+        """
+        self.cursor.execute(f'SELECT applying FROM {self.deck}.sync_state')
+        if self.cursor.fetchone()[0]:
+            return
+        if kind == 'progress':
+            # As in CHANGE_LOG_PROGRESS, the new changes replace the words' earlier ones
+            self.cursor.execute(f'''
+                DELETE FROM {self.deck}.changes
+                WHERE kind = 'progress' AND word_id IN (
+                    SELECT word_id FROM (
+                        WITH c (word_id, interval, repetitions, ease_factor, next_review_date, correct_answers)
+                        AS ({rows})
+                        SELECT word_id FROM c
+                    )
+                )
+            ''', params)
+        self.cursor.execute(f'''
+            INSERT INTO {self.deck}.changes (
+                device_id, seq, clock, kind, word_id,
+                interval, repetitions, ease_factor, next_review_date, correct_answers
+            )
+            WITH c (word_id, interval, repetitions, ease_factor, next_review_date, correct_answers) AS ({rows})
+            SELECT s.device_id, s.seq + ROW_NUMBER() OVER w, s.clock + ROW_NUMBER() OVER w, ?, c.word_id,
+                   c.interval, c.repetitions, c.ease_factor, c.next_review_date, c.correct_answers
+            FROM c, {self.deck}.sync_state s
+            WINDOW w AS (ORDER BY c.word_id)
+        ''', (*params, kind))
+        logged = self.cursor.rowcount
+        self.cursor.execute(
+            f'UPDATE {self.deck}.sync_state SET seq = seq + ?, clock = clock + ?', (logged, logged)
+        )
 
     def initialize_progress(self):
-        words = self.get_all_words()
-        for word in words:
-            word_id = word[0]
+        today = datetime.date.today().isoformat()
+        missing = f'''
+            SELECT id, 1, 0, 2.5, ?, 0 FROM {self.deck}.words w
+            WHERE NOT EXISTS (SELECT 1 FROM {self.deck}.progress p WHERE p.word_id = w.id)
+        '''
+        # Runs over a whole new deck, so the stats and change log are kept in step set-based
+        triggers = self.drop_row_triggers()
+        try:
+            self.cursor.execute(f'''
+                INSERT INTO {self.deck}.events (
+                    word_id, event_type, event_date,
+                    interval, repetitions, ease_factor, next_review_date, correct_answers
+                )
+                SELECT id, 'init', ?, 1, 0, 2.5, ?, 0 FROM {self.deck}.words w
+                WHERE NOT EXISTS (SELECT 1 FROM {self.deck}.progress p WHERE p.word_id = w.id)
+            ''', (today, today))
+            self.log_bulk_changes('progress', missing, (today,))
+            # Introduced words without progress are due today; none of them are mastered
+            self.cursor.execute(f'''
+                INSERT INTO {self.deck}.review_calendar (review_date, words)
+                SELECT ?, COUNT(*) FROM {self.deck}.words w
+                WHERE introduced = 1
+                AND NOT EXISTS (SELECT 1 FROM {self.deck}.progress p WHERE p.word_id = w.id)
+                HAVING COUNT(*) > 0
+                ON CONFLICT(review_date) DO UPDATE SET words = words + excluded.words
+            ''', (today,))
             # Insert default progress only if it doesn't exist
-            self.cursor.execute('''
-                INSERT OR IGNORE INTO progress (
+            self.cursor.execute(f'''
+                INSERT INTO {self.deck}.progress (
+                    word_id, interval, repetitions, ease_factor, next_review_date, correct_answers
+                ) {missing}
+            ''', (today,))
+            self.restore_row_triggers(triggers)
+        except Exception:
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+
+    def get_level_index(self):
+        """Word count and id range for every level, read from the level index."""
+        self.cursor.execute(f'''
+            SELECT level, COUNT(*), MIN(id), MAX(id)
+            FROM {self.deck}.words
+            GROUP BY level
+        ''')
+        return self.cursor.fetchall()
+
+    def get_word_at_level(self, level, start_id, exclude_ids=()):
+        """First word of `level` at or after `start_id`, wrapping around, skipping `exclude_ids`."""
+        exclude = ', '.join('?' for _ in exclude_ids)
+        for id_condition in ('id >= ?', 'id < ?'):
+            self.cursor.execute(f'''
+                SELECT id, spanish, english, image_path
+                FROM {self.deck}.words
+                WHERE level = ? AND {id_condition} AND id NOT IN ({exclude})
+                ORDER BY id
+                LIMIT 1
+            ''', (level, start_id, *exclude_ids))
+            word = self.cursor.fetchone()
+            if word:
+                return word
+        return None
+
+    def seed_known_levels(self, levels):
+        """
+        Mark every word of `levels` as known, as if the learner pressed "Know This" on each.
+        Words practised already keep their progress; progress never touched since
+        initialize_progress is seeded over. Returns the number of words seeded.
+        """
+        if not levels:
+            return 0
+        placeholders = ', '.join('?' for _ in levels)
+        today = datetime.date.today()
+        next_review_date = (today + datetime.timedelta(days=3)).isoformat()
+        untouched = f'''
+            SELECT p.word_id FROM {self.deck}.progress p
+            JOIN {self.deck}.words w ON w.id = p.word_id
+            WHERE w.level IN ({placeholders}) AND p.repetitions = 0 AND p.correct_answers = 0
+            AND NOT EXISTS (
+                SELECT 1 FROM {self.deck}.events e WHERE e.word_id = p.word_id AND e.event_type = 'review'
+            )
+        '''
+        unseeded = f'''
+            SELECT id, 3, 5, 2.5, ?, 5 FROM {self.deck}.words w
+            WHERE level IN ({placeholders})
+            AND NOT EXISTS (SELECT 1 FROM {self.deck}.progress p WHERE p.word_id = w.id)
+        '''
+        # A placement test can seed most of a large deck, so the stats and change log
+        # are kept in step set-based rather than by the row triggers
+        triggers = self.drop_row_triggers()
+        try:
+            self.cursor.execute(f'''
+                INSERT INTO {self.deck}.events (
+                    word_id, event_type, event_date,
+                    interval, repetitions, ease_factor, next_review_date, correct_answers
+                )
+                SELECT id, 'seed', ?, 3, 5, 2.5, ?, 5 FROM {self.deck}.words w
+                WHERE level IN ({placeholders})
+                AND NOT EXISTS (SELECT 1 FROM {self.deck}.progress p WHERE p.word_id = w.id)
+            ''', (today.isoformat(), next_review_date, *levels))
+            # Untouched progress is replaced: a 'set' event, as a 'seed' one only applies to
+            # words without progress, and off the calendar until it is inserted again below
+            self.cursor.execute(f'''
+                INSERT INTO {self.deck}.events (
+                    word_id, event_type, event_date,
+                    interval, repetitions, ease_factor, next_review_date, correct_answers
+                )
+                SELECT word_id, 'set', ?, 3, 5, 2.5, ?, 5 FROM ({untouched})
+            ''', (today.isoformat(), next_review_date, *levels))
+            self.cursor.execute(f'''
+                UPDATE {self.deck}.review_calendar SET words = review_calendar.words - c.dropped
+                FROM (
+                    SELECT p.next_review_date AS review_date, COUNT(*) AS dropped
+                    FROM {self.deck}.progress p JOIN {self.deck}.words w ON w.id = p.word_id
+                    WHERE w.introduced = 1 AND p.word_id IN ({untouched})
+                    GROUP BY p.next_review_date
+                ) c
+                WHERE review_calendar.review_date = c.review_date
+            ''', levels)
+            self.cursor.execute(
+                f'DELETE FROM {self.deck}.progress WHERE word_id IN ({untouched})', levels
+            )
+
+            # Words introduced now bring the progress they already have onto the calendar
+            self.cursor.execute(f'''
+                INSERT INTO {self.deck}.review_calendar (review_date, words)
+                SELECT p.next_review_date, COUNT(*)
+                FROM {self.deck}.words w
+                JOIN {self.deck}.progress p ON p.word_id = w.id
+                WHERE w.level IN ({placeholders}) AND w.introduced = 0
+                GROUP BY p.next_review_date
+                ON CONFLICT(review_date) DO UPDATE SET words = words + excluded.words
+            ''', levels)
+            self.log_bulk_changes('progress', unseeded, (next_review_date, *levels))
+            self.cursor.execute(f'''
+                INSERT INTO {self.deck}.progress (
                     word_id, interval, repetitions, ease_factor, next_review_date, correct_answers
-                ) VALUES (?, ?, ?, ?, ?, ?)
-            ''', (
-                word_id, 1, 0, 2.5, datetime.date.today().isoformat(), 0
-            ))
+                ) {unseeded}
+            ''', (next_review_date, *levels))
+            seeded = self.cursor.rowcount
+
+            self.log_bulk_changes('introduced', f'''
+                SELECT id, NULL, NULL, NULL, NULL, NULL FROM {self.deck}.words
+                WHERE level IN ({placeholders}) AND introduced = 0
+            ''', levels)
+            self.cursor.execute(
+                f'UPDATE {self.deck}.words SET introduced = 1 WHERE level IN ({placeholders}) AND introduced = 0',
+                levels
+            )
+            introduced = self.cursor.rowcount
+
+            # Every seeded word ends up introduced, due in three days, with 5 correct answers
+            self.cursor.execute(f'''
+                UPDATE {self.deck}.deck_stats
+                SET value = value + CASE stat WHEN 'introduced' THEN ? ELSE ? * (5 >= ?) END
+                WHERE stat IN ('introduced', 'mastered')
+            ''', (introduced, seeded, MASTERY_THRESHOLD))
+            if seeded:
+                self.cursor.execute(f'''
+                    INSERT INTO {self.deck}.review_calendar (review_date, words) VALUES (?, ?)
+                    ON CONFLICT(review_date) DO UPDATE SET words = words + excluded.words
+                ''', (next_review_date, seeded))
+            self.restore_row_triggers(triggers)
+        except Exception:
+            self.conn.rollback()
+            raise
         self.conn.commit()
+        return seeded
 
     def get_total_words(self):
-        self.cursor.execute('SELECT COUNT(*) FROM words')
+        self.cursor.execute(f"SELECT value FROM {self.deck}.deck_stats WHERE stat = 'total'")
         return self.cursor.fetchone()[0]
 
     def get_mastered_words(self):
-        self.cursor.execute('SELECT COUNT(*) FROM progress WHERE correct_answers >= ?', (5,))
+        self.cursor.execute(f"SELECT value FROM {self.deck}.deck_stats WHERE stat = 'mastered'")
         return self.cursor.fetchone()[0]
 
+    def get_deck_stats(self):
+        """
+        Totals for the dashboard: 'total', 'introduced', 'mastered', 'due_today',
+        and 'levels', a dict of word counts per level.
+        """
+        self.cursor.execute(f'SELECT stat, value FROM {self.deck}.deck_stats')
+        stats = {'levels': {}}
+        for stat, value in self.cursor.fetchall():
+            if stat.startswith('level:'):
+                if value:
+                    stats['levels'][stat[len('level:'):]] = value
+            else:
+                stats[stat] = value
+        self.cursor.execute(
+            f'SELECT COALESCE(SUM(words), 0) FROM {self.deck}.review_calendar WHERE review_date <= ?',
+            (datetime.date.today().isoformat(),)
+        )
+        stats['due_today'] = self.cursor.fetchone()[0]
+        return stats
 
     def increment_correct_answers(self, word_id):
-        """Increment correct answers for a word and mark it fully learned if it reaches 5."""
-        self.cursor.execute('''
-            UPDATE words
+        """Increment correct answers for a word; it counts as mastered once it reaches MASTERY_THRESHOLD."""
+        self.cursor.execute(f'''
+            UPDATE {self.deck}.progress
             SET correct_answers = correct_answers + 1
-            WHERE id = ?
+            WHERE word_id = ?
         ''', (word_id,))
+        if self.cursor.rowcount:
+            self.log_event(word_id, 'increment')
         self.conn.commit()
 
     def get_any_review_word(self):
         """
         Retrieve any word that has been introduced (for review) regardless of due date.
         """
-        self.cursor.execute('''
-            SELECT 'due' AS word_type, id, spanish, english, correct_answers, image_path
-            FROM words
-            WHERE introduced = 1
+        self.cursor.execute(f'''
+            SELECT 'due' AS word_type, w.id, w.spanish, w.english, COALESCE(p.correct_answers, 0), w.image_path
+            FROM {self.deck}.words w
+            LEFT JOIN {self.deck}.progress p ON w.id = p.word_id
+            WHERE w.introduced = 1
             ORDER BY RANDOM()
             LIMIT 1
         ''')
@@ -201,9 +1095,10 @@ class Database:
         """
         Retrieve any word from the database, ignoring its status.
         """
-        self.cursor.execute('''
-            SELECT 'random' AS word_type, id, spanish, english, correct_answers, image_path
-            FROM words
+        self.cursor.execute(f'''
+            SELECT 'random' AS word_type, w.id, w.spanish, w.english, COALESCE(p.correct_answers, 0), w.image_path
+            FROM {self.deck}.words w
+            LEFT JOIN {self.deck}.progress p ON w.id = p.word_id
             ORDER BY RANDOM()
             LIMIT 1
         ''')
@@ -211,20 +1106,314 @@ class Database:
 
     def get_word_performance_history(self, word_id):
         """Fetch performance history for a specific word, including dates and counts of correct/incorrect responses."""
-        self.cursor.execute('''
-            SELECT response_date, 
-                   SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) AS correct_count,
-                   SUM(CASE WHEN correct = 0 THEN 1 ELSE 0 END) AS incorrect_count
-            FROM response_history
-            WHERE word_id = ?
+        self.cursor.execute(f'''
+            SELECT response_date, SUM(correct_count) AS correct_count, SUM(incorrect_count) AS incorrect_count
+            FROM (
+                SELECT response_date,
+                       SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END) AS correct_count,
+                       SUM(CASE WHEN correct = 0 THEN 1 ELSE 0 END) AS incorrect_count
+                FROM {self.deck}.response_history
+                WHERE word_id = ?
+                GROUP BY response_date
+                UNION ALL
+                SELECT response_date, correct_count, incorrect_count
+                FROM {self.deck}.response_daily
+                WHERE word_id = ?
+            )
             GROUP BY response_date
             ORDER BY response_date
-        ''', (word_id,))
+        ''', (word_id, word_id))
         return self.cursor.fetchall()
 
+    def compact_history(self, time_budget=0.05, vacuum_pages=64, schema=None):
+        """
+        Roll raw responses older than `retention_days` into `response_daily`, one day
+        at a time, fold events as old into snapshots (see fold_events), then give free
+        pages back with incremental vacuum.
+        Works on the active deck unless given the `schema` of another attached one.
+        Stops after roughly `time_budget` seconds; returns True once there is nothing left to do.
+        """
+        if self.retention_days is None:
+            return True
+        schema = schema or self.deck
 
+        deadline = time.monotonic() + time_budget
+        cutoff = (datetime.date.today() - datetime.timedelta(days=self.retention_days)).isoformat()
 
+        while time.monotonic() < deadline:
+            self.cursor.execute(
+                f'SELECT MIN(response_date) FROM {schema}.response_history WHERE response_date < ?', (cutoff,)
+            )
+            day = self.cursor.fetchone()[0]
+            if day is None:
+                break
+            self.cursor.execute(f'''
+                INSERT INTO {schema}.response_daily (word_id, response_date, correct_count, incorrect_count)
+                SELECT word_id, response_date,
+                       SUM(CASE WHEN correct = 1 THEN 1 ELSE 0 END),
+                       SUM(CASE WHEN correct = 0 THEN 1 ELSE 0 END)
+                FROM {schema}.response_history
+                WHERE response_date = ?
+                GROUP BY word_id
+                ON CONFLICT(word_id, response_date) DO UPDATE SET
+                    correct_count = correct_count + excluded.correct_count,
+                    incorrect_count = incorrect_count + excluded.incorrect_count
+            ''', (day,))
+            self.cursor.execute(f'DELETE FROM {schema}.response_history WHERE response_date = ?', (day,))
+            self.conn.commit()
+        else:
+            return False
+        # Their copies in the change log go too, pushed or not, so it stays bounded without sync
+        self.cursor.execute(
+            f"DELETE FROM {schema}.changes WHERE kind = 'response' AND response_date < ?", (cutoff,)
+        )
+        self.conn.commit()
 
+        while time.monotonic() < deadline:
+            if not self.fold_events(schema, cutoff):
+                break
+        else:
+            return False
 
+        self.cursor.execute(f'PRAGMA {schema}.auto_vacuum')
+        if self.cursor.fetchone()[0] != 2:
+            # Database was created before incremental vacuum; SQLite reuses the free pages instead
+            return True
 
+        while time.monotonic() < deadline:
+            self.cursor.execute(f'PRAGMA {schema}.freelist_count')
+            if self.cursor.fetchone()[0] == 0:
+                return True
+            # executescript steps the pragma to completion; execute would free a single page
+            self.conn.executescript(f'PRAGMA {schema}.incremental_vacuum({int(vacuum_pages)})')
+        return False
 
+    def fold_events(self, schema, cutoff, batch_words=FOLD_BATCH_WORDS):
+        """
+        Replace the events of up to `batch_words` words with events dated before `cutoff`
+        with one 'snapshot' event per word holding the progress they add up to, so the event
+        log stops growing with old answers. A word's events after its last one before `cutoff`
+        are kept as they are; replay.py gives the same progress either way.
+        Returns False once no word has events left to fold.
+        """
+        # A word whose only events before the cutoff are a snapshot is folded already. DISTINCT
+        # would have SQLite scan idx_events_word instead of idx_events_unfolded; IN drops repeats.
+        self.cursor.execute(f'''
+            SELECT id, word_id, event_type, event_date, quality, correct,
+                   interval, repetitions, ease_factor, next_review_date, correct_answers
+            FROM {schema}.events
+            WHERE word_id IN (
+                SELECT word_id FROM {schema}.events
+                WHERE event_type != 'snapshot' AND event_date < ?
+                LIMIT ?
+            )
+            ORDER BY id
+        ''', (cutoff, batch_words))
+        words = {}
+        for event in self.cursor.fetchall():
+            words.setdefault(event[1], []).append(event)
+        if not words:
+            return False
+
+        deleted = []
+        snapshots = []
+        for word_id, events in words.items():
+            last = max(i for i, event in enumerate(events) if event[3] < cutoff)
+            events = events[:last + 1]
+            # The rules replay.py applies, with the SM-2 step of apply_review
+            progress = None
+            for _, _, event_type, event_date, quality, correct, *values in events:
+                if event_type in PROGRESS_EVENTS:
+                    if progress is None or event_type in ('set', 'snapshot'):
+                        progress = tuple(values)
+                elif progress is None:
+                    continue
+                elif event_type == 'increment':
+                    progress = (*progress[:4], progress[4] + 1)
+                else:
+                    progress = sm2_review(progress, quality, correct, datetime.date.fromisoformat(event_date))
+            deleted.extend((event[0],) for event in events)
+            if progress is not None:
+                # Takes the place of the last folded event, so it stays ahead of the word's later events
+                snapshots.append((events[-1][0], word_id, events[-1][3], *progress))
+
+        self.cursor.executemany(f'DELETE FROM {schema}.events WHERE id = ?', deleted)
+        self.cursor.executemany(f'''
+            INSERT INTO {schema}.events (
+                id, word_id, event_type, event_date,
+                interval, repetitions, ease_factor, next_review_date, correct_answers
+            ) VALUES (?, ?, 'snapshot', ?, ?, ?, ?, ?, ?)
+        ''', snapshots)
+        self.conn.commit()
+        return True
+
+    def compact_decks(self, time_budget=0.05):
+        """
+        compact_history for every deck whose file exists, sharing `time_budget` between them.
+        A deck other than the active one is attached only for its share and detached again,
+        without the table setup of use_deck. Returns True once all of them are done.
+        """
+        deadline = time.monotonic() + time_budget
+        decks = [(MAIN_DECK, None)] + [(name, path) for name, path in self.get_deck_files() if os.path.exists(path)]
+        for name, path in decks:
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            if name in self.attached_decks:
+                done = self.compact_history(remaining, schema=self.attached_decks[name])
+            else:
+                done = self.compact_detached_deck(deck_schema(name), path, remaining)
+            if not done:
+                return False
+        return True
+
+    def compact_detached_deck(self, schema, path, time_budget):
+        self.conn.commit()
+        self.cursor.execute(f'ATTACH DATABASE ? AS {schema}', (path,))
+        try:
+            self.cursor.execute(f"SELECT name FROM {schema}.sqlite_master WHERE type = 'table'")
+            if not set(COMPACTED_TABLES) <= {row[0] for row in self.cursor.fetchall()}:
+                # Written by an older version: compacted once use_deck has brought it up to date
+                return True
+            return self.compact_history(time_budget, schema=schema)
+        finally:
+            self.conn.commit()
+            self.cursor.execute(f'DETACH DATABASE {schema}')
+
+    def get_sync_state(self):
+        """(device_id, seq, pushed_seq, pulled_position) of the active deck; see sync.py."""
+        self.cursor.execute(f'SELECT device_id, seq, pushed_seq, pulled_position FROM {self.deck}.sync_state')
+        return self.cursor.fetchone()
+
+    def new_device_id(self):
+        """
+        Give this copy of the deck a device id of its own, e.g. after copying the database
+        file from another machine. The copy already holds every change the other machine
+        had made, so those are not merged again.
+        """
+        device_id = uuid.uuid4().hex
+        self.cursor.execute(f'''
+            INSERT INTO {self.deck}.sync_peers (device_id, seq)
+            SELECT device_id, seq FROM {self.deck}.sync_state WHERE seq > 0
+            ON CONFLICT(device_id) DO UPDATE SET seq = MAX(seq, excluded.seq)
+        ''')
+        self.cursor.execute(
+            f'UPDATE {self.deck}.sync_state SET device_id = ?, seq = 0, pushed_seq = 0', (device_id,)
+        )
+        self.conn.commit()
+        return device_id
+
+    def get_unpushed_changes(self, limit):
+        """
+        Up to `limit` of this device's changes the sync server does not have yet, oldest first.
+        Words are named by (spanish, english), as word ids differ between devices.
+        """
+        self.cursor.execute(f'''
+            SELECT c.device_id, c.seq, c.clock, c.kind, w.spanish, w.english,
+                   c.interval, c.repetitions, c.ease_factor, c.next_review_date, c.correct_answers,
+                   c.response_date, c.correct
+            FROM {self.deck}.sync_state s
+            JOIN {self.deck}.changes c ON c.device_id = s.device_id AND c.seq > s.pushed_seq
+            LEFT JOIN {self.deck}.words w ON w.id = c.word_id
+            ORDER BY c.seq
+            LIMIT ?
+        ''', (limit,))
+        return self.cursor.fetchall()
+
+    def mark_pushed(self, seq):
+        """Record that the sync server has this device's changes up to `seq`."""
+        self.cursor.execute(f'UPDATE {self.deck}.sync_state SET pushed_seq = MAX(pushed_seq, ?)', (seq,))
+        self.conn.commit()
+
+    def apply_changes(self, changes, position):
+        """
+        Merge changes from other devices, as sent by the sync server, and note that its log
+        has been read up to `position`. Returns how many changes were new.
+
+        Responses are added to the history (and shifted into the answer bitsets in the order
+        they arrive, which can differ between devices). Introduced words stay introduced.
+        For progress the change with the highest
+        (clock, device_id) wins, in whatever order changes arrive, so every device ends up
+        with the same progress. A device's changes reach the server in seq order, so any
+        at or below its entry in sync_peers were merged before and are skipped, as are
+        changes to words this deck lacks.
+        """
+        self.cursor.execute(f'SELECT spanish, english, id FROM {self.deck}.words')
+        words = {(spanish, english): word_id for spanish, english, word_id in self.cursor.fetchall()}
+        self.cursor.execute(f'SELECT device_id, seq FROM {self.deck}.sync_peers')
+        peers = dict(self.cursor.fetchall())
+        applied = 0
+        try:
+            self.cursor.execute(f'UPDATE {self.deck}.sync_state SET applying = 1')
+            for device_id, seq, clock, kind, spanish, english, *values in changes:
+                if seq <= peers.get(device_id, 0):
+                    continue
+                peers[device_id] = seq
+                word_id = words.get((spanish, english))
+                if word_id is None:
+                    continue
+                applied += 1
+                # Lamport clock: local changes made from now on order after this one
+                self.cursor.execute(f'UPDATE {self.deck}.sync_state SET clock = MAX(clock, ?)', (clock,))
+
+                if kind == 'response':
+                    response_date, correct = values[5:]
+                    self.add_response(word_id, response_date, correct)
+                    continue
+                if kind == 'introduced':
+                    self.cursor.execute(
+                        f'UPDATE {self.deck}.words SET introduced = 1 WHERE id = ? AND introduced = 0', (word_id,)
+                    )
+                    continue
+
+                # Kept so that later changes to the word can be ordered against it
+                self.cursor.execute(f'''
+                    INSERT INTO {self.deck}.changes (
+                        device_id, seq, clock, kind, word_id,
+                        interval, repetitions, ease_factor, next_review_date, correct_answers
+                    ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                ''', (device_id, seq, clock, kind, word_id, *values[:5]))
+
+                self.cursor.execute(f'''
+                    SELECT device_id, seq FROM {self.deck}.changes
+                    WHERE kind = 'progress' AND word_id = ?
+                    ORDER BY clock DESC, device_id DESC
+                    LIMIT 1
+                ''', (word_id,))
+                winner = self.cursor.fetchone()
+                self.cursor.execute(f'''
+                    DELETE FROM {self.deck}.changes
+                    WHERE kind = 'progress' AND word_id = ? AND NOT (device_id = ? AND seq = ?)
+                ''', (word_id, *winner))
+                if winner != (device_id, seq):
+                    continue
+                self.set_progress(word_id, values[:5])
+            self.cursor.executemany(f'''
+                INSERT INTO {self.deck}.sync_peers (device_id, seq) VALUES (?, ?)
+                ON CONFLICT(device_id) DO UPDATE SET seq = excluded.seq
+            ''', peers.items())
+            self.cursor.execute(
+                f'UPDATE {self.deck}.sync_state SET applying = 0, pulled_position = ?', (position,)
+            )
+        except Exception:
+            # Whatever went wrong, applying = 1 must not be committed later: it would stop the change log
+            self.conn.rollback()
+            raise
+        self.conn.commit()
+        self.answer_histories.pop(self.deck, None)
+        return applied
+
+    def prune_changes(self):
+        """
+        Drop change log rows sync no longer needs: responses and introductions already on
+        the server. Progress changes are replaced as they are overtaken (see CHANGE_LOG_PROGRESS).
+        """
+        self.cursor.execute(f'''
+            DELETE FROM {self.deck}.changes
+            WHERE kind != 'progress'
+            AND NOT EXISTS (
+                SELECT 1 FROM {self.deck}.sync_state s
+                WHERE s.device_id = changes.device_id AND changes.seq > s.pushed_seq
+            )
+        ''')
+        self.conn.commit()
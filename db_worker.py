@@ -0,0 +1,124 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+from database import Database, MAIN_DECK
+
+# How often the Tk thread checks whether a database result has arrived
+POLL_INTERVAL_MS = 10
+
+# Read-only connections for charts, progress views and reports
+READER_THREADS = 2
+
+
+class DatabaseWorker:
+    """
+    Owns the SQLite connection on a single background thread.
+
+    Requests are queued and run in order, so writes made from the GUI keep the
+    order they were issued in. Every request returns a `concurrent.futures.Future`;
+    use `deliver` to hand the result back to the Tk main loop.
+
+    With `threads` > 1 each thread has a connection of its own and takes the next
+    queued request, so requests no longer run in order; only use that for reads.
+    """
+
+    def __init__(self, factory=Database, threads=1, name='vocab-db'):
+        self.requests = queue.Queue()
+        self.threads = []
+        for i in range(threads):
+            ready = Future()
+            thread = threading.Thread(
+                target=self.run, args=(factory, ready), name=name if threads == 1 else f'{name}-{i}', daemon=True
+            )
+            thread.start()
+            # Re-raise any error from opening the database on the caller's thread
+            ready.result()
+            self.threads.append(thread)
+
+    def run(self, factory, ready):
+        try:
+            db = factory()
+        except Exception as e:
+            ready.set_exception(e)
+            return
+        ready.set_result(None)
+
+        while True:
+            request = self.requests.get()
+            if request is None:
+                break
+            future, fn, args = request
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                future.set_result(fn(db, *args))
+            except Exception as e:
+                print(f"Database error in {getattr(fn, '__name__', fn)}: {e}")
+                future.set_exception(e)
+        db.conn.close()
+
+    def submit(self, fn, *args):
+        """Run `fn(db, *args)` on the database thread."""
+        future = Future()
+        self.requests.put((future, fn, args))
+        return future
+
+    def call(self, method, *args):
+        """Run the `Database` method named `method` on the database thread."""
+        def run_method(db, *method_args):
+            return getattr(db, method)(*method_args)
+        run_method.__name__ = method
+        return self.submit(run_method, *args)
+
+    def close(self):
+        """Finish the queued requests and close the connections."""
+        for _ in self.threads:
+            self.requests.put(None)
+        for thread in self.threads:
+            thread.join()
+
+
+class ReaderPool(DatabaseWorker):
+    """
+    Read-only connections for analytics and reports, on threads of their own.
+
+    The store is in WAL mode, so these reads never wait on the practice writes queued
+    on the DatabaseWorker, nor make them wait. Each request runs in one read transaction
+    and sees a consistent snapshot: everything committed before it started, nothing after.
+    Set `deck` to the name of the writer's active deck; requests run on it.
+    """
+
+    def __init__(self, path, threads=READER_THREADS):
+        super().__init__(lambda: Database(path, read_only=True), threads, name='vocab-read')
+        self.deck = MAIN_DECK
+
+    def submit(self, fn, *args):
+        """Run `fn(db, *args)` on a reader thread, against a snapshot of the current deck."""
+        deck = self.deck
+
+        def read(db, *read_args):
+            db.use_deck(deck)
+            db.conn.execute('BEGIN')
+            try:
+                return fn(db, *read_args)
+            finally:
+                db.conn.rollback()
+        read.__name__ = getattr(fn, '__name__', 'read')
+        return super().submit(read, *args)
+
+
+def deliver(widget, future, callback, poll_interval=POLL_INTERVAL_MS, on_error=None):
+    """
+    Call `callback(result)` from the Tk main loop once `future` has finished, or
+    `on_error(exception)` if the request failed.
+    """
+    def poll():
+        if not future.done():
+            widget.after(poll_interval, poll)
+        elif future.exception() is None:
+            callback(future.result())
+        elif on_error is not None:
+            on_error(future.exception())
+
+    widget.after(0, poll)
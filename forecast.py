@@ -0,0 +1,57 @@
+import numpy as np
+
+from spaced_repetition import QUALITY_CORRECT, QUALITY_INCORRECT, sm2_review_arrays
+
+DEFAULT_FORECAST_DAYS = 90
+DEFAULT_RECALL_RATE = 0.85
+
+
+def load_schedule(db):
+    """
+    Read the review state of every introduced word into NumPy arrays:
+    interval, ease_factor, repetitions and days until the next review (overdue words are due today).
+    """
+    rows = db.get_review_schedule()
+    schedule = np.array(rows, dtype=np.float64).reshape(-1, 4)
+    interval = schedule[:, 0].astype(np.int64)
+    ease_factor = schedule[:, 1]
+    repetitions = schedule[:, 2].astype(np.int64)
+    due_in = np.maximum(schedule[:, 3], 0).astype(np.int64)
+    return interval, ease_factor, repetitions, due_in
+
+
+def forecast_reviews(interval, ease_factor, repetitions, due_in, days=DEFAULT_FORECAST_DAYS,
+                     recall_rate=DEFAULT_RECALL_RATE, seed=0):
+    """
+    Project how many reviews fall on each of the next `days` days.
+
+    Every word is assumed to be reviewed on the day it is due and recalled with
+    probability `recall_rate`; each review then moves the word on with the same
+    SM-2 rules as SpacedRepetitionScheduler.update_progress. Returns an array of
+    daily review counts, starting with today.
+    """
+    rng = np.random.default_rng(seed)
+    # 64-bit day counts: intervals grow geometrically and a long streak overflows 32 bits
+    interval = interval.astype(np.int64)
+    ease_factor = ease_factor.astype(np.float64)
+    repetitions = repetitions.astype(np.int64)
+    due_in = due_in.astype(np.int64)
+    counts = np.zeros(days, dtype=np.int64)
+
+    for day in range(days):
+        due = np.flatnonzero(due_in == day)
+        counts[day] = due.size
+        if not due.size:
+            continue
+
+        recalled = rng.random(due.size) < recall_rate
+        quality = np.where(recalled, QUALITY_CORRECT, QUALITY_INCORRECT)
+        new_interval, repetitions[due], ease_factor[due] = sm2_review_arrays(
+            interval[due], repetitions[due], ease_factor[due], quality
+        )
+        np.maximum(new_interval, 1, out=new_interval)
+
+        interval[due] = new_interval
+        due_in[due] = day + new_interval
+
+    return counts
@@ -1,11 +1,23 @@
 import tkinter as tk
-from tkinter import messagebox, font
-from matplotlib import pyplot as plt
+from tkinter import messagebox, font, filedialog
+from matplotlib.figure import Figure
+from matplotlib.backends.backend_tkagg import FigureCanvasTkAgg
 from tkinter import ttk
-from database import Database
+from database import Database, MAIN_DECK, DEFAULT_DB_PATH, MEMORY_DB
+from db_worker import DatabaseWorker, ReaderPool, deliver
+from stall_monitor import StallMonitor
 from vocabulary import Word
 from spaced_repetition import SpacedRepetitionScheduler
+from placement import PlacementTest
+from session_planner import SessionPlanner, SECONDS_PER_NEW_CARD, SECONDS_PER_REVIEW_CARD
+from recall_selector import RecallSelector
+from answer_history import RECENT_ANSWERS
+from forecast import load_schedule, forecast_reviews, DEFAULT_FORECAST_DAYS, DEFAULT_RECALL_RATE
+from performance_charts import render_performance, CHART_WIDTH, CHART_HEIGHT, CHART_CACHE_SIZE
+from sync import SyncClient, sync
+from collections import OrderedDict
 import datetime
+import functools
 import random
 from PIL import Image, ImageTk
 import os
@@ -13,24 +25,67 @@ import os
 
 class VocabularyApp:
     def __init__(self):
-        self.db = Database()
-        self.scheduler = SpacedRepetitionScheduler(self.db)
+        # All database access goes through the worker thread; see when_ready.
+        # Set VOCAB_APP_DB to open another database file.
+        db_path = os.environ.get('VOCAB_APP_DB', DEFAULT_DB_PATH)
+        self.db = DatabaseWorker(functools.partial(Database, db_path))
+        # Progress views, charts and reports read through their own connections, so practice
+        # writes never queue behind them. An in-memory store cannot be shared, so it has none.
+        self.readers = ReaderPool(db_path) if db_path != MEMORY_DB else self.db
+        self.scheduler = self.db.submit(SpacedRepetitionScheduler).result()
         self.root = tk.Tk()
         self.root.title("Spanish Vocabulary App")
         self.root.geometry("800x600")
         self.root.configure(bg="#f0f0f0")
         self.default_font = font.Font(size=14)
+        self.current_deck = MAIN_DECK
         self.setup_main_menu()
         self.session_stats = {'new_words': 0, 'words_progressed': 0}
+        self.all_words = None
 
-        # New word introduction tracking
+        # Rendered performance charts by word id, most recently viewed last; see show_word_performance
+        self.performance_charts = OrderedDict()
+        self.performance_window = None
+
+        # New word introduction limits, enforced by the session planner
         self.max_new_words_in_a_row = 5
         self.max_new_words_per_minute = 10
-        self.new_words_introduced = 0
-        self.new_words_in_last_minute = 0
-        self.last_minute_start_time = datetime.datetime.now()
+        self.planner = None
+        self.current_card = None
+        self.practice_window = None
+        self.test_window = None
         self.practice_end_time = 0
 
+        # Set VOCAB_APP_SYNC_SERVER (e.g. http://127.0.0.1:8765, see sync_server.py) to sync between devices
+        self.sync_server = os.environ.get('VOCAB_APP_SYNC_SERVER')
+
+        # Compact old response history in small slices while the app is idle
+        self.root.after(1000, self.compact_history_step)
+
+        # Set VOCAB_APP_STALL_REPORT=1 to print how long the main loop was blocked on exit
+        self.stall_monitor = None
+        if os.environ.get('VOCAB_APP_STALL_REPORT'):
+            self.stall_monitor = StallMonitor(self.root)
+            self.stall_monitor.start()
+
+    def when_ready(self, future, callback, on_error=None):
+        """
+        Run `callback(result)` on the Tk thread once a database request finishes.
+        If it fails, `on_error(exception)` runs instead; by default the error is shown.
+        """
+        deliver(self.root, future, callback, on_error=on_error or self.show_database_error)
+
+    def show_database_error(self, error):
+        messagebox.showerror("Database Error", str(error))
+
+    def compact_history_step(self):
+        def schedule_next(done):
+            if not done:
+                self.root.after(200, self.compact_history_step)
+
+        # Housekeeping: a failure is already printed by the worker and is retried on the next start
+        self.when_ready(self.db.call('compact_decks'), schedule_next, on_error=lambda error: None)
+
     def setup_main_menu(self):
         for widget in self.root.winfo_children():
             widget.destroy()
@@ -44,6 +99,24 @@ class VocabularyApp:
         )
         welcome_label.pack(pady=20)
 
+        deck_frame = tk.Frame(self.root, bg="#f0f0f0")
+        deck_frame.pack(pady=5)
+
+        tk.Label(deck_frame, text="Deck:", font=self.default_font, bg="#f0f0f0", fg="black").pack(side="left")
+        self.deck_var = tk.StringVar(value=self.current_deck)
+        deck_menu = tk.OptionMenu(deck_frame, self.deck_var, self.current_deck)
+        deck_menu.config(font=self.default_font)
+        deck_menu.pack(side="left", padx=5)
+        self.when_ready(self.db.call('get_decks'), lambda decks: self.fill_deck_menu(deck_menu, decks))
+
+        tk.Button(
+            deck_frame,
+            text="Add Deck...",
+            font=self.default_font,
+            command=self.add_deck,
+            fg="black"
+        ).pack(side="left", padx=5)
+
         btn_frame = tk.Frame(self.root, bg="#f0f0f0")
         btn_frame.pack(pady=10)
 
@@ -77,6 +150,27 @@ class VocabularyApp:
             fg="black"
         ).pack(pady=10)
 
+        tk.Button(
+            btn_frame,
+            text="Review Forecast",
+            font=self.default_font,
+            command=self.show_review_forecast,
+            width=20,
+            bg="#9C27B0",
+            fg="black"
+        ).pack(pady=10)
+
+        if self.sync_server:
+            tk.Button(
+                btn_frame,
+                text="Sync",
+                font=self.default_font,
+                command=self.sync_progress,
+                width=20,
+                bg="#009688",
+                fg="black"
+            ).pack(pady=10)
+
         tk.Button(
             btn_frame,
             text="Exit",
@@ -87,11 +181,185 @@ class VocabularyApp:
             fg="black"
         ).pack(pady=10)
 
+    def sync_progress(self):
+        deck = self.current_deck
+
+        def run_sync(db):
+            client = SyncClient(self.sync_server)
+            try:
+                pushed, pulled, applied = sync(db, client, deck)
+            except OSError as e:
+                return f"Could not sync with {self.sync_server}: {e}"
+            return (f"Sent {pushed} changes and received {applied} new ones "
+                    f"({(client.bytes_sent + client.bytes_received) / 1024:.1f} KB).")
+
+        def show_result(message):
+            # Merged answers can change any word's chart or choices
+            self.all_words = None
+            self.performance_charts.clear()
+            messagebox.showinfo("Sync", message)
+
+        self.when_ready(self.db.submit(run_sync), show_result)
+
+    def fill_deck_menu(self, deck_menu, decks):
+        menu = deck_menu['menu']
+        menu.delete(0, 'end')
+        for name in decks:
+            menu.add_command(label=name, command=lambda deck=name: self.switch_deck(deck))
+
+    def session_open(self):
+        """
+        True while a practice session or level test is running. Its writes use word ids of
+        the active deck, so the deck must not change under it.
+        """
+        return any(window is not None and window.winfo_exists() for window in (self.practice_window, self.test_window))
+
+    def switch_deck(self, name):
+        if self.session_open():
+            self.deck_var.set(self.current_deck)
+            messagebox.showinfo("Deck", "Finish the practice session or level test before switching decks.")
+            return
+        # Only the chosen deck's file is attached; the others are not read
+        self.when_ready(self.db.call('use_deck', name), lambda _: self.use_deck_in_gui(name), self.deck_failed)
+
+    def deck_failed(self, error):
+        """Put the worker back on the deck the GUI shows after switching or adding a deck failed."""
+        self.deck_var.set(self.current_deck)
+        self.db.call('use_deck', self.current_deck)
+        self.show_database_error(error)
+
+    def use_deck_in_gui(self, name):
+        """Follow the worker to deck `name` once it is active there."""
+        self.deck_var.set(name)
+        self.current_deck = name
+        self.all_words = None
+        self.performance_charts.clear()
+        # Readers follow only now that the writer has attached the deck's file
+        if self.readers is not self.db:
+            self.readers.deck = name
+
+    def add_deck(self):
+        if self.session_open():
+            messagebox.showinfo("Deck", "Finish the practice session or level test before adding a deck.")
+            return
+        vocabulary_file = filedialog.askopenfilename(
+            title="Choose a vocabulary CSV", filetypes=[("CSV files", "*.csv")]
+        )
+        if not vocabulary_file:
+            return
+        name = os.path.splitext(os.path.basename(vocabulary_file))[0]
+
+        def add_and_use(db):
+            db.add_deck(name, vocabulary_file)
+            db.use_deck(name)
+
+        def show_deck(_):
+            self.use_deck_in_gui(name)
+            self.setup_main_menu()
+
+        self.when_ready(self.db.submit(add_and_use), show_deck, self.deck_failed)
+
     def start_level_test(self):
-        # For simplicity, we'll assume the user is at level A1
-        messagebox.showinfo("Level Test", "Level Test is under development.\nAssuming level A1 for now.")
-        # Load vocabulary for level A1
-        self.db.initialize_progress()
+        self.when_ready(self.db.call('get_level_index'), self.begin_level_test)
+
+    def begin_level_test(self, level_index):
+        self.placement = PlacementTest(level_index)
+        if not self.placement.levels:
+            messagebox.showinfo("Level Test", "There are no words in the deck yet.")
+            return
+
+        self.test_window = tk.Toplevel(self.root)
+        self.test_window.title("Level Test")
+        self.test_window.geometry("600x500")
+        self.test_window.configure(bg="#f0f0f0")
+        self.next_test_question()
+
+    def next_test_question(self):
+        level = self.placement.next_level()
+        if level is None:
+            self.finish_level_test()
+            return
+
+        word_future = self.db.call(
+            'get_word_at_level',
+            self.placement.levels[level],
+            self.placement.random_start_id(level),
+            self.placement.asked_ids
+        )
+        self.when_ready(word_future, lambda word: self.show_test_question(level, word))
+
+    def show_test_question(self, level, word):
+        if word is None:
+            # Every word of this level has been asked already
+            self.finish_level_test()
+            return
+        if self.all_words is None:
+            self.when_ready(self.db.call('get_all_words'), lambda all_words: self.show_test_choices(level, word, all_words))
+        else:
+            self.show_test_choices(level, word, self.all_words)
+
+    def show_test_choices(self, level, word, all_words):
+        self.all_words = all_words
+        word_id, spanish, english, image_path = word
+
+        for widget in self.test_window.winfo_children():
+            widget.destroy()
+
+        tk.Label(
+            self.test_window,
+            text=f"Question {self.placement.questions + 1}: select the correct Spanish translation:",
+            font=("Helvetica", 18),
+            bg="#f0f0f0",
+            fg="#333"
+        ).pack(pady=10)
+
+        tk.Label(
+            self.test_window,
+            text=english,
+            font=("Helvetica", 24),
+            bg="#f0f0f0",
+            fg="black"
+        ).pack(pady=20)
+
+        choices = self.generate_choices(spanish, all_words)
+        random.shuffle(choices)
+        choice_var = tk.StringVar()
+
+        for choice in choices:
+            tk.Radiobutton(
+                self.test_window,
+                text=choice,
+                variable=choice_var,
+                value=choice,
+                font=self.default_font,
+                bg="#f0f0f0",
+                fg="black"
+            ).pack(anchor='w', padx=20)
+
+        def submit():
+            self.placement.record(level, word_id, choice_var.get() == spanish)
+            self.next_test_question()
+
+        tk.Button(
+            self.test_window,
+            text="Submit",
+            font=self.default_font,
+            command=submit,
+            bg="#2196F3",
+            fg="black"
+        ).pack(pady=20)
+
+    def finish_level_test(self):
+        placed_level = self.placement.placed_level_name()
+
+        def show_result(seeded):
+            self.test_window.destroy()
+            messagebox.showinfo(
+                "Level Test",
+                f"Your level: {placed_level}\n{seeded} words from easier levels were marked as known."
+            )
+
+        self.when_ready(self.db.call('seed_known_levels', self.placement.mastered_levels()), show_result)
 
     def setup_practice_options(self):
         self.options_window = tk.Toplevel(self.root)
@@ -158,6 +426,38 @@ class VocabularyApp:
 
         self.practice_end_time = datetime.datetime.now() + datetime.timedelta(seconds=self.practice_time)
         self.update_timer()
+        self.when_ready(
+            self.db.submit(
+                self.plan_session, self.practice_time, self.max_new_words_in_a_row, self.max_new_words_per_minute
+            ),
+            self.start_planned_session,
+            self.session_failed
+        )
+
+    def plan_session(self, db, practice_time, max_new_in_a_row, max_new_per_minute):
+        """Runs on the database thread; the only queries a session makes to choose its cards."""
+        max_cards = practice_time // SECONDS_PER_REVIEW_CARD + 1
+        new_words = db.get_new_words(practice_time // SECONDS_PER_NEW_CARD + 1)
+        return SessionPlanner(
+            db.get_due_words(max_cards),
+            db.get_review_words(max_cards),
+            new_words,
+            practice_time,
+            max_new_in_a_row,
+            max_new_per_minute,
+            # Chooses each review card by estimated recall as the session goes
+            RecallSelector(db.get_recall_features(), new_words)
+        )
+
+    def session_failed(self, error):
+        """Close the practice window when its session cannot be planned or reported."""
+        self.show_database_error(error)
+        if self.practice_window.winfo_exists():
+            self.practice_window.destroy()
+        self.setup_main_menu()
+
+    def start_planned_session(self, planner):
+        self.planner = planner
         self.next_word()
 
     def update_timer(self):
@@ -186,25 +486,16 @@ class VocabularyApp:
             self.show_session_report()
             return
 
-        # Determine if the next word should be new or review based on user’s performance
-
-        review_chance = 1/((self.session_stats['words_progressed'])*.025 +1)
-
-        # Use probabilistic choice for new or review
-        if random.random() < review_chance:
-            word_data = self.scheduler.get_due_word(ignore_due_date=True)
-        else:
-            word_data = self.scheduler.get_next_word()
-
-        # If no word was found, ensure fallback to any word available for practice
+        word_data = self.planner.next_card()
         if not word_data:
-            word_data = self.scheduler.get_any_word()
-
-        # Display the word data
-        if word_data:
-            self.display_word(word_data)
-        else:
             self.show_session_report()
+            return
+
+        if word_data[0] == 'new':
+            # Mark as introduced as soon as it is shown
+            self.db.call('mark_word_as_introduced', word_data[1])
+        self.current_card = word_data
+        self.display_word(word_data)
 
     def display_word(self, word_data):
         try:
@@ -307,8 +598,16 @@ class VocabularyApp:
             fg="black"
         ).pack(pady=20)
 
+        # The deck does not change while practising, so its word list is fetched once
+        if self.all_words is None:
+            self.when_ready(self.db.call('get_all_words'), lambda all_words: self.show_choices(word, all_words))
+        else:
+            self.show_choices(word, self.all_words)
+
+    def show_choices(self, word, all_words):
+        self.all_words = all_words
         # Generate multiple choices
-        choices = self.generate_choices(word.spanish)
+        choices = self.generate_choices(word.spanish, all_words)
         random.shuffle(choices)
 
         self.choice_var = tk.StringVar()
@@ -333,8 +632,7 @@ class VocabularyApp:
             fg="black"
         ).pack(pady=20)
 
-    def generate_choices(self, correct_spanish):
-        all_words = self.db.get_all_words()
+    def generate_choices(self, correct_spanish, all_words):
         choices = [correct_spanish]
         while len(choices) < 4:
             word = random.choice(all_words)
@@ -380,12 +678,14 @@ class VocabularyApp:
             correct = False
 
         # Log response in the database
-        self.db.log_response(self.current_word.word_id, correct)
+        self.db.call('log_response', self.current_word.word_id, correct)
+        self.performance_charts.pop(self.current_word.word_id, None)
+        self.planner.record_answer(self.current_card, correct)
 
         # Update word progress based on the response quality
         self.practice_window.after(100, lambda: messagebox.showinfo("Result", feedback_message))
 
-        self.scheduler.update_progress(self.current_word.word_id, quality, correct)
+        self.update_progress(self.current_word.word_id, quality, correct)
 
         # Delay to let user see feedback and move to the next word
         self.practice_window.after(100, self.next_word)
@@ -456,17 +756,32 @@ class VocabularyApp:
             messagebox.showinfo("Result", f"Incorrect. The correct answer is: {self.current_word.spanish}")
             quality = 2
             correct = False
-        self.db.log_response(self.current_word.word_id, correct)
+        self.db.call('log_response', self.current_word.word_id, correct)
+        self.performance_charts.pop(self.current_word.word_id, None)
+        self.planner.record_answer(self.current_card, correct)
 
         # Update word progress based on the response quality
-        self.scheduler.update_progress(self.current_word.word_id, quality, correct)
+        self.update_progress(self.current_word.word_id, quality, correct)
 
         # Move to the next word
         self.practice_window.after(100, self.next_word)
 
+    def update_progress(self, word_id, quality, correct):
+        self.db.submit(lambda db: self.scheduler.update_progress(word_id, quality, correct))
+
     def show_session_report(self):
-        total_words = self.db.get_total_words()
-        mastered_words = self.db.get_mastered_words()
+        def fetch_totals(db):
+            return db.get_total_words(), db.get_mastered_words()
+
+        # Wait for this session's queued answers to be committed, then read the totals from a snapshot
+        self.when_ready(
+            self.db.submit(lambda db: None),
+            lambda _: self.when_ready(self.readers.submit(fetch_totals), self.show_session_totals, self.session_failed),
+            self.session_failed
+        )
+
+    def show_session_totals(self, totals):
+        total_words, mastered_words = totals
         percent_learned = (mastered_words / total_words) * 100 if total_words > 0 else 0
 
         report_message = (
@@ -483,6 +798,11 @@ class VocabularyApp:
 
     def run(self):
         self.root.mainloop()
+        if self.readers is not self.db:
+            self.readers.close()
+        self.db.close()
+        if self.stall_monitor:
+            print(f"UI stalls: {self.stall_monitor.report()}")
 
     def know_this_word(self):
         # Set correct_answers to the threshold (e.g., 5) to mark as mastered
@@ -494,7 +814,8 @@ class VocabularyApp:
         next_review_date_str = next_review_date.isoformat()
 
         # Update progress in the database
-        self.db.insert_progress(
+        self.db.call(
+            'insert_progress',
             self.current_word.word_id,
             interval,
             repetitions,
@@ -503,6 +824,11 @@ class VocabularyApp:
             correct_answers
         )
 
+        self.planner.record_answer(
+            self.current_card, True, correct_answers,
+            (interval, repetitions, ease_factor, next_review_date_str, correct_answers)
+        )
+
         messagebox.showinfo("Word Known", f"Great! '{self.current_word.spanish}' marked as known.")
         self.next_word()
 
@@ -514,7 +840,8 @@ class VocabularyApp:
         ease_factor = 2.5
         next_review_date = datetime.date.today().isoformat()
 
-        self.db.insert_progress(
+        self.db.call(
+            'insert_progress',
             self.current_word.word_id,
             interval,
             repetitions,
@@ -523,6 +850,11 @@ class VocabularyApp:
             correct_answers
         )
 
+        self.planner.record_answer(
+            self.current_card, False,
+            progress=(interval, repetitions, ease_factor, next_review_date, correct_answers)
+        )
+
         messagebox.showinfo("Word Added", f"'{self.current_word.spanish}' added to your learning queue.")
         self.next_word()
 
@@ -531,6 +863,14 @@ class VocabularyApp:
         progress_window.title("Progress Visualization")
         progress_window.geometry("700x500")
 
+        # Deck summary, read from the trigger-maintained deck_stats table
+        summary_var = tk.StringVar(value="Loading...")
+        tk.Label(progress_window, textvariable=summary_var, font=self.default_font).pack(side=tk.TOP, fill="x", pady=5)
+        self.when_ready(
+            self.readers.submit(lambda db: (db.get_deck_stats(), db.get_attached_deck_totals())),
+            lambda stats: summary_var.set(self.format_deck_stats(*stats))
+        )
+
         # Create a Canvas for scrolling
         canvas = tk.Canvas(progress_window)
         canvas.pack(side=tk.LEFT, fill=tk.BOTH, expand=True)
@@ -546,17 +886,43 @@ class VocabularyApp:
         canvas.create_window((0, 0), window=progress_frame, anchor="nw")
         canvas.configure(yscrollcommand=scrollbar.set)
 
+        def fetch_words_with_progress(db):
+            # Streak and recent accuracy of every word come from the answer bitsets in one pass
+            stats = db.get_answer_stats()
+            return [
+                (word, db.get_word_progress(word[0]), stats.get(word[0], (0, None)))
+                for word in db.get_all_words()
+            ]
+
+        self.when_ready(
+            self.readers.submit(fetch_words_with_progress),
+            lambda words: self.show_progress_bars(canvas, progress_frame, words)
+        )
+
+    def format_deck_stats(self, stats, deck_totals):
+        levels = "  ".join(f"{level}: {count}" for level, count in sorted(stats['levels'].items()))
+        summary = (
+            f"{self.current_deck}: mastered {stats['mastered']}/{stats['total']}   "
+            f"Introduced {stats['introduced']}   "
+            f"Due today {stats['due_today']}\n"
+            f"{levels}"
+        )
+        if len(deck_totals) > 1:
+            total = sum(deck[1] for deck in deck_totals)
+            mastered = sum(deck[2] for deck in deck_totals)
+            summary += f"\nAll loaded decks: mastered {mastered}/{total}"
+        return summary
+
+    def show_progress_bars(self, canvas, progress_frame, words):
         # Add all word progress bars to the frame
-        words = self.db.get_all_words()
-        for word_id, spanish, english, image_path in words:
+        for (word_id, spanish, english, image_path), word_progress, (streak, accuracy) in words:
             progress_bar_frame = tk.Frame(progress_frame)
             progress_bar_frame.pack(fill="x", pady=5, padx=10)
 
             word_label = tk.Label(progress_bar_frame, text=f"{spanish} - {english}", font=self.default_font)
             word_label.pack(side="left", padx=5)
 
-            # Get progress and set the bar value based on the mastery level (out of 5)
-            word_progress = self.db.get_word_progress(word_id)
+            # Set the bar value based on the mastery level (out of 5)
             if word_progress:
                 correct_answers = word_progress[4] if word_progress[4] is not None else 0
                 progress_value = correct_answers  # Value should directly represent progress towards 5 correct answers
@@ -568,10 +934,13 @@ class VocabularyApp:
             progress_bar['value'] = progress_value/20
             progress_bar.pack(side="left", padx=5)
 
+            recent = f"{accuracy:.0%} of last {RECENT_ANSWERS}" if accuracy is not None else "not answered yet"
+            tk.Label(progress_bar_frame, text=f"streak {streak}, {recent}").pack(side="left", padx=5)
+
             # Add button to view detailed word performance
             view_button = tk.Button(
                 progress_bar_frame, text="View", font=self.default_font,
-                command=lambda w_id=word_id: self.show_word_performance(w_id)
+                command=lambda w_id=word_id, title=spanish: self.show_word_performance(w_id, title)
             )
             view_button.pack(side="left", padx=5)
 
@@ -579,44 +948,82 @@ class VocabularyApp:
         progress_frame.update_idletasks()  # Ensure frame has updated height
         canvas.config(scrollregion=canvas.bbox("all"))  # Define scrollable region
 
-    def show_word_performance(self, word_id):
-        # Fetch performance data from the database
-        performance_data = self.db.get_word_performance_history(word_id)
-        dates = [data[0] for data in performance_data]
-        correct_counts = [data[1] for data in performance_data]
-        incorrect_counts = [data[2] for data in performance_data]
-
-        # Calculate cumulative correct and incorrect counts
-        cumulative_correct = [sum(correct_counts[:i + 1]) for i in range(len(correct_counts))]
-        cumulative_incorrect = [sum(incorrect_counts[:i + 1]) for i in range(len(incorrect_counts))]
-
-        # Set up the plot with a secondary y-axis for mastery percentage
-        fig, ax1 = plt.subplots(figsize=(10, 5))
-
-        # Plot cumulative correct and incorrect responses on the primary y-axis
-        ax1.plot(dates, cumulative_correct, label="Cumulative Correct", color="green")
-        ax1.plot(dates, cumulative_incorrect, label="Cumulative Incorrect", color="red")
-        ax1.set_xlabel("Date")
-        ax1.set_ylabel("Total Responses")
-        ax1.set_title("Performance Over Time")
-
-        # Secondary y-axis for mastery level percentage
-        mastery_threshold = 5  # Define mastery threshold (e.g., 5 correct answers for mastery)
-        ax2 = ax1.twinx()  # Instantiate a second y-axis that shares the same x-axis
-        mastery_percentage = [(correct / 20)*100 for correct in cumulative_correct]
-        ax2.plot(dates, mastery_percentage, label="Mastery Level (%)", color="blue", linestyle="--")
-        ax2.set_ylabel("Mastery Level (%)")
-        ax2.set_ylim(0, 100)  # Set limits from 0 to 100%
-
-        # Add horizontal reference line for 100% mastery on the right y-axis
-
-        # Combine legends from both axes
-        lines, labels = ax1.get_legend_handles_labels()
-        lines2, labels2 = ax2.get_legend_handles_labels()
-        ax1.legend(lines + lines2, labels + labels2, loc="upper left")
-
-        plt.tight_layout()
-        plt.show()
+    def show_review_forecast(self):
+        forecast_window = tk.Toplevel(self.root)
+        forecast_window.title("Review Forecast")
+        forecast_window.geometry("800x500")
+
+        options_frame = tk.Frame(forecast_window)
+        options_frame.pack(side=tk.TOP, pady=5)
+
+        tk.Label(options_frame, text="Days:", font=self.default_font).pack(side="left")
+        days_entry = tk.Entry(options_frame, font=self.default_font, width=5)
+        days_entry.insert(0, str(DEFAULT_FORECAST_DAYS))
+        days_entry.pack(side="left", padx=5)
+
+        tk.Label(options_frame, text="Recall rate (%):", font=self.default_font).pack(side="left")
+        recall_entry = tk.Entry(options_frame, font=self.default_font, width=5)
+        recall_entry.insert(0, str(int(DEFAULT_RECALL_RATE * 100)))
+        recall_entry.pack(side="left", padx=5)
+
+        figure = Figure(figsize=(8, 4))
+        ax = figure.add_subplot()
+        chart = FigureCanvasTkAgg(figure, master=forecast_window)
+
+        def draw(counts):
+            ax.clear()
+            ax.bar(range(len(counts)), counts, color="#9C27B0")
+            ax.set_xlabel("Days from today")
+            ax.set_ylabel("Reviews")
+            ax.set_title(f"Projected reviews: {int(counts.sum())} over {len(counts)} days")
+            figure.tight_layout()
+            chart.draw()
+
+        def update():
+            try:
+                days = int(days_entry.get())
+                recall_rate = float(recall_entry.get()) / 100
+            except ValueError:
+                messagebox.showerror("Invalid Input", "Please enter a number of days and a recall rate.")
+                return
+            self.when_ready(self.readers.submit(lambda db: forecast_reviews(*load_schedule(db), days, recall_rate)), draw)
+
+        tk.Button(options_frame, text="Update", font=self.default_font, command=update).pack(side="left", padx=5)
+        chart.get_tk_widget().pack(fill=tk.BOTH, expand=True)
+        update()
+
+    def show_word_performance(self, word_id, title):
+        # One window and canvas are reused for every word
+        if self.performance_window is None or not self.performance_window.winfo_exists():
+            self.performance_window = tk.Toplevel(self.root)
+            self.performance_window.resizable(False, False)
+            self.performance_canvas = tk.Canvas(
+                self.performance_window, width=CHART_WIDTH, height=CHART_HEIGHT, bg="white", highlightthickness=0
+            )
+            self.performance_canvas.pack()
+            self.performance_image = self.performance_canvas.create_image(0, 0, anchor="nw")
+        self.performance_window.title(f"Performance: {title}")
+        self.performance_window.lift()
+
+        chart = self.performance_charts.get(word_id)
+        if chart is not None:
+            self.performance_charts.move_to_end(word_id)
+            self.performance_canvas.itemconfig(self.performance_image, image=chart)
+            return
+
+        # Rendered off-screen on a reader thread; only the finished image is handed to Tk
+        self.when_ready(
+            self.readers.submit(lambda db: render_performance(db.get_word_performance_history(word_id))),
+            lambda image: self.show_performance_chart(word_id, image)
+        )
+
+    def show_performance_chart(self, word_id, image):
+        chart = ImageTk.PhotoImage(image)
+        self.performance_charts[word_id] = chart
+        if len(self.performance_charts) > CHART_CACHE_SIZE:
+            self.performance_charts.popitem(last=False)
+        if self.performance_window.winfo_exists():
+            self.performance_canvas.itemconfig(self.performance_image, image=chart)
 
 
 
@@ -0,0 +1,190 @@
+import argparse
+import multiprocessing
+import os
+import sqlite3
+import time
+
+import numpy as np
+from matplotlib.backends.backend_agg import FigureCanvasAgg
+from matplotlib.dates import AutoDateLocator, ConciseDateFormatter
+from matplotlib.figure import Figure
+from PIL import Image
+
+from database import DEFAULT_DB_PATH
+
+# Size of the chart shown by "View", as the old 10x5 inch figure at 100 dpi
+CHART_WIDTH = 1000
+CHART_HEIGHT = 500
+CHART_DPI = 100
+
+# Rendered charts the app keeps in memory, about 2 MB each
+CHART_CACHE_SIZE = 20
+
+# Batch mode: small multiples per PNG page, and the size of each chart
+CHARTS_PER_ROW = 5
+ROWS_PER_PAGE = 5
+SMALL_CHART_SIZE = 240
+
+# Cumulative correct answers that count as 100% mastery on the chart, as on the progress bars
+MASTERY_ANSWERS = 20
+
+
+def performance_series(performance_data):
+    """
+    Days and cumulative correct / incorrect counts from rows of
+    (response_date, correct_count, incorrect_count), as returned by get_word_performance_history.
+    """
+    days = np.array([row[0] for row in performance_data], dtype='datetime64[D]')
+    correct = np.cumsum([row[1] for row in performance_data], dtype=np.int64)
+    incorrect = np.cumsum([row[2] for row in performance_data], dtype=np.int64)
+    return days, correct, incorrect
+
+
+def downsample(days, max_points):
+    """
+    Indices of the points worth drawing when the chart is about `max_points` / 2 pixels wide.
+
+    Points are grouped by the pixel column they fall in and only the first and last of
+    each column are kept. The counts are cumulative, so never decrease, and those two
+    points carry everything the column can show.
+    """
+    if len(days) <= max_points:
+        return np.arange(len(days))
+    columns = max(1, max_points // 2)
+    offsets = (days - days[0]).astype(np.int64)
+    column = offsets * (columns - 1) // max(1, offsets[-1])
+    first = np.flatnonzero(np.r_[True, column[1:] != column[:-1]])
+    last = np.r_[first[1:] - 1, len(days) - 1]
+    return np.union1d(first, last)
+
+
+def draw_performance(ax, performance_data, width, detailed=True):
+    """
+    Plot a word's cumulative correct and incorrect answers on `ax`, downsampled to `width` pixels.
+    The detailed chart also gets the mastery level on a second axis, labels and a legend.
+    """
+    days, correct, incorrect = performance_series(performance_data)
+    if not len(days):
+        ax.text(0.5, 0.5, "No responses yet", ha="center", va="center", transform=ax.transAxes)
+        return
+    keep = downsample(days, width)
+    days, correct, incorrect = days[keep], correct[keep], incorrect[keep]
+
+    ax.plot(days, correct, label="Cumulative Correct", color="green")
+    ax.plot(days, incorrect, label="Cumulative Incorrect", color="red")
+    if not detailed:
+        return
+
+    ax.set_xlabel("Date")
+    ax.set_ylabel("Total Responses")
+    ax.set_title("Performance Over Time")
+
+    # Secondary y-axis for mastery level percentage
+    mastery_ax = ax.twinx()
+    mastery_ax.plot(days, np.minimum(correct / MASTERY_ANSWERS * 100, 100), label="Mastery Level (%)", color="blue", linestyle="--")
+    mastery_ax.set_ylabel("Mastery Level (%)")
+    mastery_ax.set_ylim(0, 100)
+
+    lines, labels = ax.get_legend_handles_labels()
+    lines2, labels2 = mastery_ax.get_legend_handles_labels()
+    ax.legend(lines + lines2, labels + labels2, loc="upper left")
+
+
+def render_performance(performance_data, width=CHART_WIDTH, height=CHART_HEIGHT, dpi=CHART_DPI):
+    """
+    Draw a word's performance chart off-screen and return it as a PIL image.
+    Needs no Tk, so it can run on the database worker thread.
+    """
+    figure = Figure(figsize=(width / dpi, height / dpi), dpi=dpi)
+    canvas = FigureCanvasAgg(figure)
+    draw_performance(figure.add_subplot(), performance_data, width)
+    figure.autofmt_xdate()
+    figure.tight_layout()
+    canvas.draw()
+    return Image.frombytes('RGBA', canvas.get_width_height(), bytes(canvas.buffer_rgba()))
+
+
+def load_histories(conn, word_ids):
+    """Performance history of each word in `word_ids`, like get_word_performance_history."""
+    placeholders = ', '.join('?' * len(word_ids))
+    histories = {word_id: [] for word_id in word_ids}
+    for word_id, *row in conn.execute(f'''
+        SELECT word_id, response_date, SUM(correct_count), SUM(incorrect_count)
+        FROM (
+            SELECT word_id, response_date, SUM(correct = 1) AS correct_count, SUM(correct = 0) AS incorrect_count
+            FROM response_history
+            WHERE word_id IN ({placeholders})
+            GROUP BY word_id, response_date
+            UNION ALL
+            SELECT word_id, response_date, correct_count, incorrect_count
+            FROM response_daily
+            WHERE word_id IN ({placeholders})
+        )
+        GROUP BY word_id, response_date
+        ORDER BY word_id, response_date
+    ''', (*word_ids, *word_ids)):
+        histories[word_id].append(row)
+    return histories
+
+
+def render_page(db_path, out_dir, page, words):
+    """Render one PNG page of small multiples for `words`, rows of (word_id, spanish). Returns its path."""
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    histories = load_histories(conn, [word_id for word_id, spanish in words])
+    conn.close()
+
+    rows = -(-len(words) // CHARTS_PER_ROW)
+    figure = Figure(figsize=(CHARTS_PER_ROW * SMALL_CHART_SIZE / CHART_DPI, rows * SMALL_CHART_SIZE / CHART_DPI),
+                    dpi=CHART_DPI)
+    canvas = FigureCanvasAgg(figure)
+    for i, (word_id, spanish) in enumerate(words):
+        ax = figure.add_subplot(rows, CHARTS_PER_ROW, i + 1)
+        draw_performance(ax, histories[word_id], SMALL_CHART_SIZE, detailed=False)
+        ax.set_title(spanish, fontsize=9)
+        ax.tick_params(labelsize=6)
+        locator = AutoDateLocator(maxticks=4)
+        ax.xaxis.set_major_locator(locator)
+        ax.xaxis.set_major_formatter(ConciseDateFormatter(locator))
+    figure.tight_layout()
+    path = os.path.join(out_dir, f'performance_{page:04d}.png')
+    canvas.print_png(path)
+    return path
+
+
+def render_deck(db_path=DEFAULT_DB_PATH, out_dir='charts', workers=None):
+    """
+    Render performance charts for every word in the deck that has responses, as PNG pages
+    of small multiples. Pages are drawn in parallel, one process each. Returns the page paths.
+    """
+    os.makedirs(out_dir, exist_ok=True)
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    words = conn.execute('''
+        SELECT id, spanish FROM words
+        WHERE id IN (SELECT word_id FROM response_history UNION SELECT word_id FROM response_daily)
+        ORDER BY id
+    ''').fetchall()
+    conn.close()
+
+    per_page = CHARTS_PER_ROW * ROWS_PER_PAGE
+    jobs = [
+        (db_path, out_dir, page, words[start:start + per_page])
+        for page, start in enumerate(range(0, len(words), per_page), 1)
+    ]
+    with multiprocessing.Pool(workers) as pool:
+        return pool.starmap(render_page, jobs)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Render performance charts for a whole deck to PNG files.")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument('--out', default='charts', help="output directory (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=None, help="processes to use (default: one per CPU)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    pages = render_deck(args.db, args.out, args.workers)
+    print(f"Rendered {len(pages)} pages to {args.out} in {time.perf_counter() - start:.2f}s")
+
+
+if __name__ == '__main__':
+    main()
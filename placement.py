@@ -0,0 +1,70 @@
+import random
+
+CEFR_LEVELS = ['A1', 'A2', 'B1', 'B2', 'C1', 'C2']
+
+# Chance of a correct answer on a level the learner has mastered, and of
+# guessing right on one they have not (one of four multiple-choice options)
+P_KNOWN = 0.9
+P_GUESS = 0.25
+
+MAX_QUESTIONS = 20
+CONFIDENCE = 0.95
+
+
+def order_levels(levels):
+    """Sort deck levels easiest first; levels outside CEFR go last."""
+    return sorted(levels, key=lambda level: (
+        CEFR_LEVELS.index(level) if level in CEFR_LEVELS else len(CEFR_LEVELS), level
+    ))
+
+
+class PlacementTest:
+    """
+    Bayesian adaptive placement over the levels present in the deck.
+
+    The hypotheses are "the learner has mastered the first k levels" for
+    k = 0..len(levels). Each question is asked at the level that splits the
+    posterior closest to half, so every answer halves the candidates much like
+    a binary search, while a slip or a lucky guess only shifts the odds.
+    """
+
+    def __init__(self, level_index):
+        # level_index: rows of (level, word_count, min_id, max_id) from Database.get_level_index
+        ranges = {level: (min_id, max_id) for level, count, min_id, max_id in level_index if count}
+        self.levels = order_levels(ranges)
+        self.id_ranges = [ranges[level] for level in self.levels]
+        self.posterior = [1 / (len(self.levels) + 1)] * (len(self.levels) + 1)
+        self.asked_ids = []
+        self.questions = 0
+
+    def next_level(self):
+        """Index of the level to ask about next, or None once the level is known."""
+        if not self.levels or self.questions >= MAX_QUESTIONS or max(self.posterior) >= CONFIDENCE:
+            return None
+        # P(mastered level i) is the posterior mass of every k > i
+        mastered = [sum(self.posterior[i + 1:]) for i in range(len(self.levels))]
+        return min(range(len(self.levels)), key=lambda i: abs(mastered[i] - 0.5))
+
+    def random_start_id(self, level):
+        """A random id inside the level's id range, to seek to with the level index."""
+        return random.randint(*self.id_ranges[level])
+
+    def record(self, level, word_id, correct):
+        self.questions += 1
+        self.asked_ids.append(word_id)
+        for k in range(len(self.posterior)):
+            p_correct = P_KNOWN if level < k else P_GUESS
+            self.posterior[k] *= p_correct if correct else 1 - p_correct
+        total = sum(self.posterior)
+        self.posterior = [p / total for p in self.posterior]
+
+    def placed_level(self):
+        """Number of levels the learner has most likely mastered."""
+        return max(range(len(self.posterior)), key=lambda k: self.posterior[k])
+
+    def mastered_levels(self):
+        return self.levels[:self.placed_level()]
+
+    def placed_level_name(self):
+        placed = self.placed_level()
+        return self.levels[placed] if placed < len(self.levels) else "all levels mastered"
@@ -0,0 +1,137 @@
+import datetime
+import math
+import time
+
+import numpy as np
+
+from spaced_repetition import QUALITY_CORRECT, QUALITY_INCORRECT, sm2_review
+
+# Pick the word whose recall probability is closest to this from below
+TARGET_RETENTION = 0.85
+
+# Recall probability when a word comes due; SM-2 intervals aim for about 90%
+RECALL_AT_DUE = 0.9
+DEFAULT_EASE_FACTOR = 2.5
+# Each answer of the current streak makes a word this much more stable than its interval alone says
+STREAK_BONUS = 0.1
+
+# Pushes words above the target below every word under it in next_card
+BELOW_SCALE = 1e300
+
+SECONDS_PER_DAY = 86400
+EPOCH_ORDINAL = datetime.date(1970, 1, 1).toordinal()
+
+
+def epoch_days(now=None):
+    """`now` (a datetime, default the current time) in days since 1970-01-01."""
+    return (now.timestamp() if now else time.time()) / SECONDS_PER_DAY
+
+
+def decay_rate(interval, ease_factor, correct_answers):
+    """
+    Log recall probability lost per day since the last review. Recall falls to RECALL_AT_DUE
+    after one stability, which is the interval scaled by ease and the current streak.
+    """
+    stability = np.maximum(interval, 1) * (ease_factor / DEFAULT_EASE_FACTOR) * (1 + STREAK_BONUS * correct_answers)
+    return math.log(RECALL_AT_DUE) / stability
+
+
+class RecallSelector:
+    """
+    Chooses review cards by how likely the learner is to remember them.
+
+    Memory features of every introduced word sit in NumPy arrays, so a pick is one
+    vectorized pass over the deck. Only words that have fallen to the target retention
+    compete, so a word answered a moment ago never takes the slot of an overdue one.
+    Words start out inactive (never picked) until they have progress, like the new
+    words of the session until they are introduced.
+    """
+
+    def __init__(self, rows, new_cards=(), target_retention=TARGET_RETENTION):
+        # rows: (word_id, spanish, english, correct_answers, image_path,
+        #        interval, repetitions, ease_factor, next_review_date) from Database.get_recall_features;
+        # new_cards: the session's new word cards, which join once introduced
+        rows = list(rows) + [card[1:6] + (None,) * 4 for card in new_cards]
+        self.cards = [('due',) + tuple(row[:5]) for row in rows]
+        self.index = {row[0]: i for i, row in enumerate(rows)}
+        self.log_target = math.log(target_retention)
+
+        n = len(rows)
+        self.interval = np.ones(n, dtype=np.float64)
+        self.repetitions = np.zeros(n, dtype=np.int64)
+        self.ease_factor = np.full(n, DEFAULT_EASE_FACTOR)
+        self.correct_answers = np.zeros(n, dtype=np.int64)
+        # Inactive words are last reviewed at +inf: their score is infinite and never wins
+        self.last_review = np.full(n, np.inf)
+        self.scores = np.empty(n, dtype=np.float64)
+        self.below = np.empty(n, dtype=np.float64)
+
+        for i, row in enumerate(rows):
+            interval, repetitions, ease_factor, next_review_date = row[5:9]
+            if next_review_date is not None:
+                self.set_progress(i, (interval, repetitions, ease_factor, next_review_date, row[3] or 0))
+        self.decay = decay_rate(self.interval, self.ease_factor, self.correct_answers)
+
+    def set_progress(self, i, progress, reviewed_at=None):
+        interval, repetitions, ease_factor, next_review_date, correct_answers = progress
+        self.interval[i] = interval
+        self.repetitions[i] = repetitions
+        self.ease_factor[i] = ease_factor
+        self.correct_answers[i] = correct_answers
+        if reviewed_at is None:
+            # Only the date of the next review is stored, so count back one interval from it
+            reviewed_at = datetime.date.fromisoformat(next_review_date).toordinal() - EPOCH_ORDINAL - interval
+        self.last_review[i] = reviewed_at
+
+    def recall_probability(self, now=None):
+        """Estimated recall probability of every word now (0 for inactive words)."""
+        with np.errstate(over='ignore'):
+            probability = np.exp(self.decay * (epoch_days(now) - self.last_review))
+        probability[self.last_review == np.inf] = 0
+        return probability
+
+    def next_card(self, now=None):
+        """
+        The card whose recall probability is at or below the target and closest to it. When
+        every word is above the target, the one least likely to be recalled. None if no word is active.
+        """
+        if not self.cards:
+            return None
+        # Comparing log probabilities picks the same word and saves an exp per word;
+        # scores are log p - log target, so words at or below the target score <= 0
+        scores = self.scores
+        np.subtract(epoch_days(now), self.last_review, out=scores)
+        scores *= self.decay
+        scores -= self.log_target
+        # min(s, -s * BELOW_SCALE) is s itself for s <= 0 and hugely negative for s > 0, so the argmax
+        # is the word closest to the target from below; arithmetic, as a masked copy is several times slower
+        below = self.below
+        with np.errstate(over='ignore'):
+            np.multiply(scores, -BELOW_SCALE, out=below)
+        np.minimum(scores, below, out=below)
+        i = int(below.argmax())
+        if scores[i] > 0:
+            i = int(scores.argmin())
+            if scores[i] == np.inf:
+                return None
+        return self.cards[i][:4] + (int(self.correct_answers[i]),) + self.cards[i][5:]
+
+    def record_answer(self, word_id, correct, progress=None, now=None):
+        """
+        Update the answered word only. Its progress is worked out with sm2_review, as the
+        scheduler does, unless the new `progress` is given (e.g. when a new word is introduced).
+        """
+        i = self.index.get(word_id)
+        if i is None:
+            return
+        if progress is None:
+            if self.last_review[i] == np.inf:
+                return
+            quality = QUALITY_CORRECT if correct else QUALITY_INCORRECT
+            progress = sm2_review(
+                (int(self.interval[i]), int(self.repetitions[i]), float(self.ease_factor[i]), None,
+                 int(self.correct_answers[i])),
+                quality, correct, datetime.date.today()
+            )
+        self.set_progress(i, progress, epoch_days(now))
+        self.decay[i] = decay_rate(self.interval[i], self.ease_factor[i], self.correct_answers[i])
@@ -0,0 +1,239 @@
+import argparse
+import datetime
+import math
+import multiprocessing
+import sqlite3
+import time
+
+import numpy as np
+
+from database import DEFAULT_DB_PATH
+from spaced_repetition import sm2_review_arrays
+
+# Event types as loaded by load_events. 'init' and 'seed' only apply to words without progress;
+# 'set' and 'snapshot' overwrite it. Reviews and increments of words without progress change nothing.
+EVENT_CODES = {'review': 0, 'increment': 1, 'init': 2, 'seed': 2, 'set': 3, 'snapshot': 3}
+REVIEW, INCREMENT, INITIAL, SET = range(4)
+
+# julianday() minus this is the date's ordinal, as used by datetime.date.fromordinal
+JULIAN_DAY_OFFSET = 1721424
+
+EASE_TOLERANCE = 1e-9
+
+MAX_DAY = datetime.date.max.toordinal()
+
+
+def load_events(conn, first_id, last_id):
+    """
+    The events of words first_id..last_id as NumPy arrays, in log order: one row of
+    (word_id, event code, day ordinal, quality, correct) per event, and one row of
+    (interval, repetitions, ease_factor, next review day, correct_answers) per event carrying progress.
+    """
+    codes = ' '.join(f"WHEN '{name}' THEN {code}" for name, code in EVENT_CODES.items())
+    # Each event comes back packed into one integer, which is far cheaper to fetch than a row.
+    # Scanning the table in log order reads it sequentially; going through the (word_id, id)
+    # index would jump to a random page for every event. SQLite skips other workers' words.
+    rows = conn.execute(f'''
+        SELECT (word_id << 28)
+               | ((CASE event_type {codes} END) << 26)
+               | ((CAST(julianday(event_date) AS INTEGER) - {JULIAN_DAY_OFFSET}) << 4)
+               | (COALESCE(quality, 0) << 1)
+               | COALESCE(correct, 0)
+        FROM events NOT INDEXED
+        WHERE word_id BETWEEN ? AND ?
+        ORDER BY id
+    ''', (first_id, last_id))
+    packed = np.fromiter((event for (event,) in rows), dtype=np.int64)
+    events = np.column_stack((
+        packed >> 28, (packed >> 26) & 0x3, (packed >> 4) & 0x3fffff, (packed >> 1) & 0x7, packed & 0x1
+    ))
+
+    values = conn.execute(f'''
+        SELECT interval, repetitions, ease_factor,
+               CAST(julianday(next_review_date) AS INTEGER) - {JULIAN_DAY_OFFSET}, COALESCE(correct_answers, 0)
+        FROM events NOT INDEXED
+        WHERE word_id BETWEEN ? AND ? AND event_type IN ('init', 'seed', 'set', 'snapshot')
+        ORDER BY id
+    ''', (first_id, last_id)).fetchall()
+    values = np.array(values, dtype=np.float64).reshape(-1, 5)
+    return events, values
+
+
+def replay_events(events, values):
+    """
+    Apply the events to per-word progress with the SM-2 rules of sm2_review.
+
+    Each round applies the next event of every word at once, so there are only as many
+    rounds as the busiest word has events. Returns the word ids, a mask of the words that
+    end up with progress, and the progress columns with the next review as a day ordinal.
+    """
+    word_ids, word = np.unique(events[:, 0], return_inverse=True)
+    n = len(word_ids)
+    has = np.zeros(n, dtype=bool)
+    interval = np.zeros(n, dtype=np.int64)
+    repetitions = np.zeros(n, dtype=np.int64)
+    ease_factor = np.zeros(n, dtype=np.float64)
+    next_day = np.zeros(n, dtype=np.int64)
+    correct_answers = np.zeros(n, dtype=np.int64)
+
+    code = events[:, 1]
+    value_row = np.cumsum(code >= INITIAL) - 1
+
+    # Position of each event among its word's events; the stable sort keeps log order within a word
+    by_word = np.argsort(word, kind='stable')
+    starts = np.searchsorted(word[by_word], np.arange(n))
+    rank = np.empty(len(events), dtype=np.int64)
+    rank[by_word] = np.arange(len(events)) - starts[word[by_word]]
+    by_round = np.argsort(rank, kind='stable')
+    bounds = np.searchsorted(rank[by_round], np.arange(rank.max() + 2 if len(rank) else 1))
+
+    for r in range(len(bounds) - 1):
+        batch = by_round[bounds[r]:bounds[r + 1]]
+        w = word[batch]
+        c = code[batch]
+
+        assign = (c == SET) | ((c == INITIAL) & ~has[w])
+        if assign.any():
+            aw = w[assign]
+            v = values[value_row[batch[assign]]]
+            interval[aw] = v[:, 0]
+            repetitions[aw] = v[:, 1]
+            ease_factor[aw] = v[:, 2]
+            next_day[aw] = v[:, 3]
+            correct_answers[aw] = v[:, 4]
+            has[aw] = True
+
+        correct_answers[w[(c == INCREMENT) & has[w]]] += 1
+
+        review = (c == REVIEW) & has[w]
+        if review.any():
+            rw = w[review]
+            e = events[batch[review]]
+            day, quality, correct = e[:, 2], e[:, 3], e[:, 4].astype(bool)
+            new_interval, repetitions[rw], ease_factor[rw] = sm2_review_arrays(
+                interval[rw], repetitions[rw], ease_factor[rw], quality
+            )
+            interval[rw] = new_interval
+            next_day[rw] = day + np.minimum(new_interval, MAX_DAY - day)
+            correct_answers[rw] = np.where(correct, correct_answers[rw] + 1, 0)
+
+    return word_ids, has, (interval, repetitions, ease_factor, next_day, correct_answers)
+
+
+def same_progress(a, b):
+    if a is None or b is None:
+        return a is b
+    return (a[0], a[1], a[3], a[4]) == (b[0], b[1], b[3], b[4]) and abs(a[2] - b[2]) <= EASE_TOLERANCE
+
+
+def replay_range(db_path, first_id, last_id, return_states=False):
+    """
+    Replay the events of words first_id..last_id and compare the result with their progress rows.
+    Runs in a worker process with its own read-only connection. Returns the number of events,
+    the mismatches as (word_id, replayed, live) and, if asked, the replayed progress rows.
+    """
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    events, values = load_events(conn, first_id, last_id)
+    live = {
+        row[0]: row[1:] for row in conn.execute('''
+            SELECT word_id, interval, repetitions, ease_factor, next_review_date, correct_answers
+            FROM progress WHERE word_id BETWEEN ? AND ?
+        ''', (first_id, last_id))
+    }
+    conn.close()
+
+    word_ids, has, progress = replay_events(events, values)
+    states = {}
+    for word_id, interval, repetitions, ease_factor, next_day, correct_answers in zip(
+            word_ids[has].tolist(), *(column[has].tolist() for column in progress)):
+        next_review_date = datetime.date.fromordinal(next_day).isoformat()
+        states[word_id] = (interval, repetitions, ease_factor, next_review_date, correct_answers)
+
+    mismatches = [
+        (word_id, states.get(word_id), live.get(word_id))
+        for word_id in sorted(states.keys() | live.keys())
+        if not same_progress(states.get(word_id), live.get(word_id))
+    ]
+    rows = [(word_id, *state) for word_id, state in states.items()] if return_states else []
+    return len(events), mismatches, rows
+
+
+def word_ranges(db_path, parts):
+    """Split the word ids with events or progress into `parts` contiguous ranges."""
+    conn = sqlite3.connect(f'file:{db_path}?mode=ro', uri=True)
+    unknown = conn.execute(f'''
+        SELECT DISTINCT event_type FROM events
+        WHERE event_type NOT IN ({', '.join('?' * len(EVENT_CODES))})
+    ''', tuple(EVENT_CODES)).fetchall()
+    if unknown:
+        conn.close()
+        raise ValueError(f"Unknown event types in the event log: {', '.join(map(str, unknown))}")
+    low, high = conn.execute('''
+        SELECT MIN(low), MAX(high) FROM (
+            SELECT MIN(word_id) AS low, MAX(word_id) AS high FROM events
+            UNION ALL
+            SELECT MIN(word_id), MAX(word_id) FROM progress
+        )
+    ''').fetchone()
+    conn.close()
+    if low is None:
+        return []
+    step = math.ceil((high - low + 1) / parts)
+    return [(start, min(start + step - 1, high)) for start in range(low, high + 1, step)]
+
+
+def replay(db_path=DEFAULT_DB_PATH, workers=None, rebuild=False):
+    """
+    Rebuild progress from the event log, one word range per process, and check it against the live table.
+    With `rebuild` the progress table is replaced by the replayed state.
+    Returns (number of events, mismatches).
+    """
+    workers = workers or multiprocessing.cpu_count()
+    jobs = [(db_path, first, last, rebuild) for first, last in word_ranges(db_path, workers)]
+    if len(jobs) > 1:
+        with multiprocessing.Pool(len(jobs)) as pool:
+            results = pool.starmap(replay_range, jobs)
+    else:
+        results = [replay_range(*job) for job in jobs]
+
+    events = sum(result[0] for result in results)
+    mismatches = [mismatch for result in results for mismatch in result[1]]
+
+    if rebuild:
+        conn = sqlite3.connect(db_path)
+        # One transaction, with the deck_stats triggers keeping the totals in step
+        conn.execute('DELETE FROM progress')
+        for result in results:
+            conn.executemany('''
+                INSERT INTO progress (word_id, interval, repetitions, ease_factor, next_review_date, correct_answers)
+                VALUES (?, ?, ?, ?, ?, ?)
+            ''', result[2])
+        conn.commit()
+        conn.close()
+    return events, mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay the event log to rebuild and verify learner progress.")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument('--workers', type=int, default=None, help="processes to use (default: one per CPU)")
+    parser.add_argument('--rebuild', action='store_true', help="replace the progress table with the replayed state")
+    parser.add_argument('--show', type=int, default=10, help="mismatches to print (default: %(default)s)")
+    args = parser.parse_args()
+
+    start = time.perf_counter()
+    events, mismatches = replay(args.db, args.workers, args.rebuild)
+    print(f"Replayed {events} events in {time.perf_counter() - start:.2f}s")
+
+    if mismatches:
+        print(f"{len(mismatches)} words differ from the progress table:")
+        for word_id, replayed, live in mismatches[:args.show]:
+            print(f"  word {word_id}: replayed {replayed}, progress {live}")
+        if args.rebuild:
+            print("Progress table rebuilt from the event log.")
+    else:
+        print("Progress table matches the event log.")
+
+
+if __name__ == '__main__':
+    main()
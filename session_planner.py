@@ -0,0 +1,148 @@
+import datetime
+from collections import deque
+
+# Rough time a learner spends on a card, used to size the plan to the session length
+SECONDS_PER_NEW_CARD = 20
+SECONDS_PER_REVIEW_CARD = 10
+
+# While due reviews remain, one new word is introduced after this many reviews
+REVIEWS_BETWEEN_NEW_WORDS = 2
+
+# A word answered wrong, or not known when introduced, comes back after this many cards
+REINSERT_GAP = 4
+
+
+def as_review_card(card):
+    """A card of the given word shown for review, keeping its display fields."""
+    word_type, word_id, spanish, english, correct_answers, image_path = card[:6]
+    return ('due', word_id, spanish, english, correct_answers, image_path)
+
+
+class SessionPlanner:
+    """
+    Orders the cards of one practice session up front.
+
+    The pools are read once when the session starts; after that the queue is
+    only adjusted in memory as answers come in. New words obey both limits:
+    at most `max_new_in_a_row` consecutive new cards and `max_new_per_minute`
+    new cards per minute, checked against the estimated time when planning and
+    against the clock when a card is handed out.
+
+    With a `selector` (see recall_selector.py), which word fills each planned
+    review slot is decided only when the card is due, from the learner's
+    estimated recall; words missed this session still come back as planned.
+    """
+
+    def __init__(self, due_words, review_words, new_words, practice_time,
+                 max_new_in_a_row, max_new_per_minute, selector=None):
+        self.max_new_in_a_row = max_new_in_a_row
+        self.max_new_per_minute = max_new_per_minute
+        self.selector = selector
+        self.queue = deque(self.plan(due_words, review_words, new_words, practice_time))
+
+        self.new_words_in_a_row = 0
+        self.new_words_in_last_minute = 0
+        self.last_minute_start_time = datetime.datetime.now()
+
+    def plan(self, due_words, review_words, new_words, practice_time):
+        due = deque(due_words)
+        new = deque(new_words)
+        # Words to revisit once there is nothing due: earlier words, then words introduced this session
+        reinforcement = deque(as_review_card(word) for word in review_words)
+
+        cards = []
+        elapsed = 0
+        new_in_a_row = 0
+        reviews_since_new = REVIEWS_BETWEEN_NEW_WORDS
+        new_per_minute = {}
+
+        while elapsed < practice_time:
+            minute = int(elapsed // 60)
+            new_allowed = (
+                new
+                and new_in_a_row < self.max_new_in_a_row
+                and new_per_minute.get(minute, 0) < self.max_new_per_minute
+                and (not due or reviews_since_new >= REVIEWS_BETWEEN_NEW_WORDS)
+            )
+
+            if new_allowed:
+                card = new.popleft()
+                reinforcement.append(as_review_card(card))
+                new_in_a_row += 1
+                reviews_since_new = 0
+                new_per_minute[minute] = new_per_minute.get(minute, 0) + 1
+                elapsed += SECONDS_PER_NEW_CARD
+            elif due or reinforcement:
+                if due:
+                    card = due.popleft()
+                else:
+                    card = reinforcement.popleft()
+                    # Cycle through the reinforcement words if the session outlasts them
+                    reinforcement.append(card)
+                new_in_a_row = 0
+                reviews_since_new += 1
+                elapsed += SECONDS_PER_REVIEW_CARD
+            elif new:
+                # Only new words are left but a limit blocks them: wait for the next minute
+                elapsed = (minute + 1) * 60
+                new_in_a_row = 0
+                continue
+            else:
+                break
+            cards.append(card)
+        return cards
+
+    def next_card(self, now=None):
+        """Next card to show, or None when the plan is used up."""
+        now = now or datetime.datetime.now()
+        if now - self.last_minute_start_time >= datetime.timedelta(minutes=1):
+            self.last_minute_start_time = now
+            self.new_words_in_last_minute = 0
+
+        if not self.queue:
+            return None
+
+        card = self.queue[0]
+        if card[0] == 'new' and (self.new_words_in_a_row >= self.max_new_in_a_row
+                                 or self.new_words_in_last_minute >= self.max_new_per_minute):
+            # The learner is faster than planned; bring the next review forward
+            review_index = next((i for i, queued in enumerate(self.queue) if queued[0] != 'new'), None)
+            if review_index is not None:
+                card = self.queue[review_index]
+                del self.queue[review_index]
+                self.new_words_in_a_row = 0
+                return self.fill_review_slot(card, now)
+
+        self.queue.popleft()
+        if card[0] == 'new':
+            self.new_words_in_a_row += 1
+            self.new_words_in_last_minute += 1
+            return card
+        self.new_words_in_a_row = 0
+        return self.fill_review_slot(card, now)
+
+    def fill_review_slot(self, card, now):
+        if self.selector is None or card[0] != 'due':
+            return card
+        return self.selector.next_card(now) or card
+
+    def record_answer(self, card, correct, correct_answers=None, progress=None):
+        """
+        Update the queue with the outcome of `card`. The mastery counter follows
+        update_progress unless `correct_answers` is given; `progress` is the word's new
+        progress when it is set directly rather than by an answer.
+        """
+        if self.selector is not None:
+            self.selector.record_answer(card[1], correct, progress)
+        if correct_answers is None:
+            correct_answers = card[4] + 1 if correct else 0
+
+        # Later cards of the same word should show the updated counter
+        for i, queued in enumerate(self.queue):
+            if queued[1] == card[1] and queued[0] != 'new':
+                self.queue[i] = queued[:4] + (correct_answers,) + queued[5:]
+
+        if not correct:
+            # Marked 'in_session' so a selector leaves the slot to this word
+            review = ('in_session',) + card[1:4] + (correct_answers, card[5])
+            self.queue.insert(min(REINSERT_GAP, len(self.queue)), review)
@@ -1,5 +1,65 @@
 import datetime
 
+import numpy as np
+
+# Answer qualities the practice screens pass to update_progress
+QUALITY_CORRECT = 5
+QUALITY_INCORRECT = 2
+
+# Longest interval SM-2 may schedule, in days. Intervals grow geometrically with a streak
+# (past SQLite's 64-bit integers after about 30 correct answers); a century is never reached in practice.
+MAX_INTERVAL = 36500
+
+
+def ease_change(quality):
+    """SM-2 ease factor adjustment for an answer of `quality`; works on NumPy arrays too."""
+    return 0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)
+
+
+def sm2_review(progress, quality, correct, review_date):
+    """
+    Apply one answer to a word's progress with SM-2.
+    `progress` is (interval, repetitions, ease_factor, next_review_date, correct_answers),
+    as returned by Database.get_word_progress; the updated tuple is returned.
+    """
+    interval, repetitions, ease_factor, next_review_date_str, correct_answers = progress
+
+    # Update based on whether the answer was correct
+    if correct:
+        correct_answers += 1
+    else:
+        correct_answers = 0  # Reset on incorrect answer
+
+    # Adjust spaced repetition calculations as needed
+    if quality < 3:
+        repetitions = 0
+        interval = 1
+    else:
+        repetitions += 1
+        interval = 1 if repetitions == 1 else (6 if repetitions == 2 else min(int(interval * ease_factor), MAX_INTERVAL))
+
+    ease_factor = max(1.3, ease_factor + ease_change(quality))
+
+    # Keep the date representable even for a review date close to the end of the calendar
+    next_review_date = review_date + datetime.timedelta(days=min(interval, (datetime.date.max - review_date).days))
+    return interval, repetitions, ease_factor, next_review_date.isoformat(), correct_answers
+
+
+def sm2_review_arrays(interval, repetitions, ease_factor, quality):
+    """
+    sm2_review for NumPy arrays of words answered once each, with answer qualities `quality`.
+    Returns the new (interval, repetitions, ease_factor); the next review date and
+    correct_answers are left to the caller.
+    """
+    recalled = quality >= 3
+    repetitions = np.where(recalled, repetitions + 1, 0)
+    # Interval uses the ease factor from before this review
+    grown = np.minimum(interval * ease_factor, MAX_INTERVAL).astype(np.int64)
+    interval = np.where(~recalled | (repetitions == 1), 1, np.where(repetitions == 2, 6, grown))
+    ease_factor = np.maximum(1.3, ease_factor + ease_change(quality))
+    return interval, repetitions, ease_factor
+
+
 class SpacedRepetitionScheduler:
     def __init__(self, db):
         self.db = db
@@ -35,38 +95,12 @@ class SpacedRepetitionScheduler:
             pass
 
     def update_progress(self, word_id, quality, correct):
-        # Only proceed if current_word_data is set
-        if not self.current_word_data:
-            print("Error: current_word_data is None")
-            return  # Exit early if there’s no current word data
+        # The database applies the answer and logs it as an event, so progress can be replayed later
+        progress = self.db.apply_review(word_id, quality, correct)
 
-        progress = self.db.get_word_progress(word_id)
-        if progress:
+        # Update current word data to reflect these changes
+        if progress and self.current_word_data:
             interval, repetitions, ease_factor, next_review_date_str, correct_answers = progress
-
-            # Update based on whether the answer was correct
-            if correct:
-                correct_answers += 1
-            else:
-                correct_answers = 0  # Reset on incorrect answer
-
-            # Adjust spaced repetition calculations as needed
-            if quality < 3:
-                repetitions = 0
-                interval = 1
-            else:
-                repetitions += 1
-                interval = 1 if repetitions == 1 else (6 if repetitions == 2 else int(interval * ease_factor))
-
-            ease_factor = max(1.3, ease_factor + (0.1 - (5 - quality) * (0.08 + (5 - quality) * 0.02)))
-
-            next_review_date = datetime.date.today() + datetime.timedelta(days=interval)
-            next_review_date_str = next_review_date.isoformat()
-
-            self.db.update_word_progress(word_id, interval, repetitions, ease_factor, next_review_date_str,
-                                         correct_answers)
-
-            # Update current word data to reflect these changes
             self.current_word_data = (
                 'due', word_id, self.current_word_data[2], self.current_word_data[3], correct_answers,
                 self.current_word_data[5], interval, repetitions, ease_factor, next_review_date_str
@@ -0,0 +1,42 @@
+import time
+
+
+class StallMonitor:
+    """
+    Measures how long the Tk main loop is blocked.
+
+    A tick is scheduled every `interval_ms`; any delay beyond that means the loop
+    was busy (for example waiting on a query) and could not redraw.
+    """
+
+    def __init__(self, root, interval_ms=16, threshold_ms=50):
+        self.root = root
+        self.interval_ms = interval_ms
+        self.threshold_ms = threshold_ms
+        self.delays = []
+        self.last_tick = None
+
+    def start(self):
+        self.last_tick = time.perf_counter()
+        self.root.after(self.interval_ms, self.tick)
+
+    def tick(self):
+        now = time.perf_counter()
+        self.record((now - self.last_tick) * 1000 - self.interval_ms)
+        self.last_tick = now
+        self.root.after(self.interval_ms, self.tick)
+
+    def record(self, delay_ms):
+        self.delays.append(max(0.0, delay_ms))
+
+    def report(self):
+        """Summary of the recorded delays, in milliseconds."""
+        if not self.delays:
+            return {'ticks': 0, 'stalls': 0, 'worst_ms': 0.0, 'p99_ms': 0.0}
+        delays = sorted(self.delays)
+        return {
+            'ticks': len(delays),
+            'stalls': sum(1 for delay in delays if delay >= self.threshold_ms),
+            'worst_ms': delays[-1],
+            'p99_ms': delays[min(len(delays) - 1, int(len(delays) * 0.99))],
+        }
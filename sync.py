@@ -0,0 +1,111 @@
+import argparse
+import json
+import time
+import urllib.parse
+import urllib.request
+import zlib
+
+from database import Database, DEFAULT_DB_PATH, MAIN_DECK
+
+DEFAULT_SYNC_SERVER = 'http://127.0.0.1:8765'
+
+# Changes sent or fetched per request
+SYNC_BATCH_SIZE = 2000
+COMPRESSION_LEVEL = 9
+
+
+def encode_batch(message):
+    """A request or reply body: compact JSON, zlib-compressed."""
+    return zlib.compress(json.dumps(message, separators=(',', ':')).encode(), COMPRESSION_LEVEL)
+
+
+def decode_batch(data):
+    return json.loads(zlib.decompress(data))
+
+
+class SyncClient:
+    """
+    Talks to a sync server such as sync_server.py.
+
+    POST /push sends a batch of one device's changes and returns the highest seq the
+    server now holds. GET /pull returns other devices' changes after a position in the
+    server's log, the position reached and whether more are waiting. Both are per deck.
+    """
+
+    def __init__(self, url=DEFAULT_SYNC_SERVER, timeout=30):
+        self.url = url.rstrip('/')
+        self.timeout = timeout
+        # Bytes on the wire, for reporting
+        self.bytes_sent = 0
+        self.bytes_received = 0
+
+    def request(self, path, params, message=None):
+        data = encode_batch(message) if message is not None else None
+        request = urllib.request.Request(
+            f'{self.url}{path}?{urllib.parse.urlencode(params)}', data=data,
+            headers={'Content-Type': 'application/octet-stream'}
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as response:
+            reply = response.read()
+        self.bytes_sent += len(data or b'')
+        self.bytes_received += len(reply)
+        return decode_batch(reply)
+
+    def push(self, deck, device_id, changes):
+        return self.request('/push', {'deck': deck, 'device': device_id}, {'changes': changes})['acked']
+
+    def pull(self, deck, device_id, since, limit=SYNC_BATCH_SIZE):
+        return self.request('/pull', {'deck': deck, 'device': device_id, 'since': since, 'limit': limit})
+
+
+def sync(db, client, deck=MAIN_DECK, batch_size=SYNC_BATCH_SIZE):
+    """
+    Exchange the active deck's changes with the sync server: push what this device has
+    changed since the last sync, then merge what other devices pushed meanwhile.
+    `deck` is the name the deck goes by on the server. Returns (pushed, pulled, applied).
+    """
+    # Progress overtaken by later answers never needs to leave the device
+    db.prune_changes()
+    device_id = db.get_sync_state()[0]
+
+    pushed = 0
+    while True:
+        changes = db.get_unpushed_changes(batch_size)
+        if not changes:
+            break
+        db.mark_pushed(client.push(deck, device_id, changes))
+        pushed += len(changes)
+
+    pulled = applied = 0
+    while True:
+        reply = client.pull(deck, device_id, db.get_sync_state()[3], batch_size)
+        applied += db.apply_changes(reply['changes'], reply['position'])
+        pulled += len(reply['changes'])
+        if not reply['more']:
+            break
+    return pushed, pulled, applied
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Sync progress and answers with a sync server.")
+    parser.add_argument('--db', default=DEFAULT_DB_PATH, help="database file (default: %(default)s)")
+    parser.add_argument('--server', default=DEFAULT_SYNC_SERVER, help="sync server URL (default: %(default)s)")
+    parser.add_argument('--deck', default=MAIN_DECK, help="deck to sync (default: %(default)s)")
+    parser.add_argument('--new-device', action='store_true',
+                        help="give this database its own device id first, e.g. after copying it from another machine")
+    args = parser.parse_args()
+
+    db = Database(args.db)
+    db.use_deck(args.deck)
+    if args.new_device:
+        print(f"New device id {db.new_device_id()}")
+    client = SyncClient(args.server)
+    start = time.perf_counter()
+    pushed, pulled, applied = sync(db, client, args.deck)
+    db.conn.close()
+    print(f"Pushed {pushed} changes, pulled {pulled} ({applied} new) in {time.perf_counter() - start:.2f}s; "
+          f"sent {client.bytes_sent} bytes, received {client.bytes_received} bytes")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,136 @@
+import argparse
+import json
+import sqlite3
+import threading
+import urllib.parse
+import zlib
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from sync import encode_batch, decode_batch, SYNC_BATCH_SIZE
+
+DEFAULT_SERVER_DB = 'sync_server.db'
+DEFAULT_PORT = 8765
+
+
+class SyncStore:
+    """
+    The server's log: every change pushed by any device, per deck, in arrival order.
+    A change is kept once per (deck, device, seq), so pushing a batch again is harmless.
+    """
+
+    def __init__(self, path=DEFAULT_SERVER_DB):
+        self.conn = sqlite3.connect(path, check_same_thread=False)
+        # One request at a time touches the connection
+        self.lock = threading.Lock()
+        self.conn.execute('''
+            CREATE TABLE IF NOT EXISTS changes (
+                position INTEGER PRIMARY KEY AUTOINCREMENT,
+                deck TEXT,
+                device_id TEXT,
+                seq INTEGER,
+                change TEXT,
+                UNIQUE (deck, device_id, seq)
+            )
+        ''')
+        self.conn.execute('CREATE INDEX IF NOT EXISTS idx_changes_deck ON changes (deck, position)')
+        self.conn.commit()
+
+    def push(self, deck, device_id, changes):
+        """Store one device's changes; returns the highest seq of theirs in the batch."""
+        rows = [(deck, device_id, change[1], json.dumps(change)) for change in changes if change[0] == device_id]
+        with self.lock:
+            self.conn.executemany(
+                'INSERT OR IGNORE INTO changes (deck, device_id, seq, change) VALUES (?, ?, ?, ?)', rows
+            )
+            self.conn.commit()
+        return max((row[2] for row in rows), default=0)
+
+    def pull(self, deck, device_id, since, limit=SYNC_BATCH_SIZE):
+        """Up to `limit` changes of other devices after position `since`."""
+        with self.lock:
+            rows = self.conn.execute('''
+                SELECT position, change FROM changes
+                WHERE deck = ? AND position > ? AND device_id != ?
+                ORDER BY position
+                LIMIT ?
+            ''', (deck, since, device_id, limit + 1)).fetchall()
+            more = len(rows) > limit
+            rows = rows[:limit]
+            if more:
+                position = rows[-1][0]
+            else:
+                # Nothing else for this device, so skip past its own changes too
+                position = self.conn.execute(
+                    'SELECT COALESCE(MAX(position), ?) FROM changes WHERE deck = ?', (since, deck)
+                ).fetchone()[0]
+        return {'changes': [json.loads(row[1]) for row in rows], 'position': position, 'more': more}
+
+
+class SyncHandler(BaseHTTPRequestHandler):
+    # Set by serve()
+    store = None
+
+    def do_POST(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path != '/push':
+            self.send_error(404)
+            return
+        params = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            message = decode_batch(self.rfile.read(int(self.headers['Content-Length'])))
+            acked = self.store.push(params['deck'], params['device'], message['changes'])
+        except (KeyError, TypeError, ValueError, IndexError, zlib.error) as e:
+            self.send_error(400, f"Bad push: {e}")
+            return
+        self.reply({'acked': acked})
+
+    def do_GET(self):
+        url = urllib.parse.urlparse(self.path)
+        if url.path != '/pull':
+            self.send_error(404)
+            return
+        params = dict(urllib.parse.parse_qsl(url.query))
+        try:
+            reply = self.store.pull(
+                params['deck'], params['device'], int(params.get('since', 0)), int(params.get('limit', SYNC_BATCH_SIZE))
+            )
+        except (KeyError, ValueError) as e:
+            self.send_error(400, f"Bad pull: {e}")
+            return
+        self.reply(reply)
+
+    def reply(self, message):
+        body = encode_batch(message)
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/octet-stream')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def serve(port=DEFAULT_PORT, path=DEFAULT_SERVER_DB, host='127.0.0.1'):
+    """A sync server on `port`, not yet started: call serve_forever(), e.g. on a thread."""
+    handler = type('Handler', (SyncHandler,), {'store': SyncStore(path)})
+    return ThreadingHTTPServer((host, port), handler)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Local reference sync server for testing device sync.")
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT, help="port to listen on (default: %(default)s)")
+    parser.add_argument('--db', default=DEFAULT_SERVER_DB, help="server database file (default: %(default)s)")
+    args = parser.parse_args()
+
+    server = serve(args.port, args.db)
+    print(f"Sync server on http://127.0.0.1:{args.port}, storing changes in {args.db}")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    server.server_close()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,57 @@
+import datetime
+import os
+import random
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database, MEMORY_DB
+
+LEVELS = ('A1', 'A2', 'B1')
+WORDS = 60
+
+
+def stats(db):
+    db.cursor.execute('SELECT stat, value FROM deck_stats WHERE value != 0 ORDER BY stat')
+    deck_stats = db.cursor.fetchall()
+    db.cursor.execute('SELECT review_date, words FROM review_calendar ORDER BY review_date')
+    return deck_stats, db.cursor.fetchall()
+
+
+def random_operation(db, rng):
+    word_id = rng.randint(1, WORDS)
+    operation = rng.randrange(8)
+    if operation == 0:
+        db.apply_review(word_id, rng.choice((2, 5)), rng.random() < 0.5)
+    elif operation == 1:
+        due = datetime.date.today() + datetime.timedelta(days=rng.randint(0, 5))
+        db.insert_progress(word_id, rng.randint(1, 6), rng.randint(0, 3), 2.5, due.isoformat(), rng.randint(0, 7))
+    elif operation == 2:
+        db.mark_word_as_introduced(word_id)
+    elif operation == 3:
+        db.increment_correct_answers(word_id)
+    elif operation == 4:
+        db.seed_known_levels(rng.sample(LEVELS, rng.randint(1, 2)))
+    elif operation == 5:
+        db.initialize_progress()
+    else:
+        db.cursor.execute('DELETE FROM progress WHERE word_id = ?', (word_id,))
+        db.conn.commit()
+
+
+@pytest.mark.parametrize('seed', range(10))
+def test_triggers_and_bulk_writes_match_a_rebuild(seed):
+    rng = random.Random(seed)
+    db = Database(MEMORY_DB, vocabulary_file=None)
+    db.cursor.executemany(
+        'INSERT INTO words (spanish, english, level) VALUES (?, ?, ?)',
+        ((f'palabra{i}', f'word{i}', LEVELS[i % len(LEVELS)]) for i in range(WORDS))
+    )
+    db.conn.commit()
+    for _ in range(60):
+        random_operation(db, rng)
+        kept = stats(db)
+        db.rebuild_deck_stats()
+        assert stats(db) == kept
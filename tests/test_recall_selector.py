@@ -0,0 +1,54 @@
+import datetime
+import math
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from recall_selector import RecallSelector, RECALL_AT_DUE, epoch_days
+
+NOW = datetime.datetime(2024, 6, 1, 12, 0)
+
+
+def selector_with_recall(probabilities):
+    """A selector over words 1..n with interval 1, reviewed so that word i has recall probabilities[i - 1] at NOW."""
+    rows = [(word_id, f'palabra{word_id}', f'word{word_id}', 0, None, 1, 1, 2.5, '2024-06-01')
+            for word_id in range(1, len(probabilities) + 1)]
+    selector = RecallSelector(rows)
+    for i, probability in enumerate(probabilities):
+        days_ago = math.log(probability) / math.log(RECALL_AT_DUE)
+        selector.set_progress(i, (1, 1, 2.5, '2024-06-01', 0), epoch_days(NOW) - days_ago)
+    return selector
+
+
+def test_recall_probability_matches_setup():
+    selector = selector_with_recall([0.36, 0.91, 0.61])
+    assert selector.recall_probability(NOW) == pytest.approx([0.36, 0.91, 0.61])
+
+
+def test_just_answered_word_does_not_take_the_next_slot():
+    selector = selector_with_recall([0.36, 0.91, 0.61])
+    picks = []
+    for _ in range(3):
+        card = selector.next_card(NOW)
+        picks.append(card[1])
+        selector.record_answer(card[1], True, now=NOW)
+    # Closest to the target from below first, then the overdue word; the 0.91 word is above the target
+    assert picks[:2] == [3, 1]
+
+
+def test_overdue_word_is_picked():
+    selector = selector_with_recall([0.2, 0.99, 0.98])
+    assert selector.next_card(NOW)[1] == 1
+
+
+def test_all_words_above_target_picks_the_weakest():
+    selector = selector_with_recall([0.97, 0.9, 0.99])
+    assert selector.next_card(NOW)[1] == 2
+
+
+def test_no_active_words():
+    rows = [(1, 'palabra', 'word', 0, None, None, None, None, None)]
+    assert RecallSelector(rows).next_card(NOW) is None
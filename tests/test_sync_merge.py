@@ -0,0 +1,74 @@
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from database import Database, MEMORY_DB
+
+WORDS = [(f'palabra{i}', f'word{i}', 'A1') for i in range(1, 6)]
+
+
+def device(device_id):
+    """An in-memory deck of WORDS with progress for none of them, syncing as `device_id`."""
+    db = Database(MEMORY_DB, vocabulary_file=None)
+    db.cursor.executemany('INSERT INTO words (spanish, english, level) VALUES (?, ?, ?)', WORDS)
+    db.cursor.execute('UPDATE sync_state SET device_id = ?', (device_id,))
+    db.conn.commit()
+    return db
+
+
+def push(db):
+    """The device's changes as the sync server would hand them to other devices."""
+    changes = db.get_unpushed_changes(1000)
+    if changes:
+        db.mark_pushed(changes[-1][1])
+    return changes
+
+
+def test_later_change_wins_whatever_the_arrival_order():
+    laptop, desktop = device('laptop'), device('desktop')
+    laptop.insert_progress(1, 3, 2, 2.5, '2030-01-01', 2)
+    from_laptop = push(laptop)
+    desktop.apply_changes(from_laptop, 1)
+    # Made after seeing the laptop's change, so it orders after it despite the lower device id
+    desktop.insert_progress(1, 6, 3, 2.6, '2030-02-01', 3)
+    from_desktop = push(desktop)
+
+    in_order, reversed_order = device('phone'), device('tablet')
+    in_order.apply_changes(from_laptop, 1)
+    in_order.apply_changes(from_desktop, 2)
+    reversed_order.apply_changes(from_desktop, 1)
+    reversed_order.apply_changes(from_laptop, 2)
+    laptop.apply_changes(from_desktop, 1)
+
+    for db in (in_order, reversed_order, laptop, desktop):
+        assert db.get_word_progress(1) == (6, 3, 2.6, '2030-02-01', 3)
+
+
+def test_equal_clocks_go_to_the_higher_device_id():
+    laptop, desktop = device('laptop'), device('desktop')
+    laptop.insert_progress(2, 3, 2, 2.5, '2030-01-01', 2)
+    desktop.insert_progress(2, 1, 0, 2.5, '2030-03-01', 0)
+    from_laptop, from_desktop = push(laptop), push(desktop)
+    assert from_laptop[-1][2] == from_desktop[-1][2]
+
+    laptop.apply_changes(from_desktop, 1)
+    desktop.apply_changes(from_laptop, 1)
+
+    for db in (laptop, desktop):
+        assert db.get_word_progress(2) == (3, 2, 2.5, '2030-01-01', 2)
+
+
+def test_redelivered_changes_are_skipped():
+    laptop, desktop = device('laptop'), device('desktop')
+    laptop.mark_word_as_introduced(3)
+    laptop.log_response(3, True)
+    laptop.insert_progress(3, 3, 2, 2.5, '2030-01-01', 2)
+    from_laptop = push(laptop)
+    assert desktop.apply_changes(from_laptop, 1) == len(from_laptop)
+    desktop.insert_progress(3, 6, 3, 2.6, '2030-02-01', 3)
+
+    assert desktop.apply_changes(from_laptop, 1) == 0
+    assert desktop.get_word_progress(3) == (6, 3, 2.6, '2030-02-01', 3)
+    desktop.cursor.execute('SELECT COUNT(*) FROM response_history WHERE word_id = 3')
+    assert desktop.cursor.fetchone()[0] == 1